@@ -1,86 +1,282 @@
-import io
-from time import monotonic
+import os
+from time import monotonic, perf_counter
+from weakref import WeakKeyDictionary
 from random import choice
 from pathlib import Path
 
+from .cache import SnapshotCache
+from .instrumentation import Instruments, Sink
+from .resolver import TransitionResolver
+from .scheduler import TransitionScheduler
+from .timing import TransitionSpec
 from .widgets.screen import ScreenInfo, TransitionScreen
 
-from rich.console import Console
+from textual._compositor import LayoutUpdate
 from textual.app import App, ComposeResult
 from textual import log
 from textual.app import App, ComposeResult
 from textual.screen import Screen
 
 
+def scroll_terminal(region, rows) -> str:
+    """Escape sequences to scroll the rows of `region` up by `rows` (down if negative)."""
+    top, bottom = region.y + 1, region.bottom
+    # Index at the bottom of the scrolling region scrolls it up a row, and reverse
+    # index at the top scrolls it down, which every VT100 compatible terminal supports
+    if rows > 0:
+        scroll = f"\x1b[{bottom};1H" + "\x1bD" * rows
+    else:
+        scroll = f"\x1b[{top};1H" + "\x1bM" * -rows
+    # Set the scrolling region, scroll it, then reset it to the whole screen
+    return f"\x1b[{top};{bottom}r{scroll}\x1b[r"
+
+
 class TransitionsApp(App):
+    # Maps (from, to) pairs of screen ids, Screen classes or "*" to transitions: an
+    # effect name, or a dict / TransitionSpec with the effect, duration and fps
+    TRANSITIONS = {}
+    # Render every frame of a transition in the worker thread that prepares it, before
+    # it starts. This counts towards TRANSITION_PREPARE_DEADLINE.
+    PRECOMPUTE_FRAMES = False
+    # What to do on navigation mid-transition: "finish", "retarget" or "queue"
+    TRANSITION_POLICY = "finish"
+    # Navigations held by the "queue" policy
+    TRANSITION_QUEUE_DEPTH = 2
+    # Seconds to wait for snapshots to be prepared before giving up on a transition
+    TRANSITION_PREPARE_DEADLINE = 0.5
+    # Memory for snapshots of recently seen screens, so returning to one is instant
+    SNAPSHOT_CACHE_BYTES = 8 * 1024 * 1024
+    # Play vertical slides by scrolling the terminal, writing only the new rows
+    HARDWARE_SCROLL = True
+
+    _transition_resolver = None
+    _transition_scheduler = None
+    _snapshot_cache = None
+    _pushed_transitions = None
+    # Only set while a sink is attached, so instrumentation is free otherwise
+    instruments: Instruments | None = None
+    pending_snapshot = None
+    transition = None
+
+    def add_transition_sink(self, sink: Sink):
+        """Send transition events to a sink (see `transitions.instrumentation`)."""
+        if self.instruments is None:
+            self.instruments = Instruments()
+        self.instruments.sinks.append(sink)
+
+    def remove_transition_sink(self, sink: Sink):
+        instruments = self.instruments
+        if instruments is not None and sink in instruments.sinks:
+            instruments.sinks.remove(sink)
+            if not instruments.sinks:
+                self.instruments = None
+
+    def can_scroll_terminal(self) -> bool:
+        return (
+            self.HARDWARE_SCROLL
+            and not self.is_headless
+            and os.environ.get("TERM") != "dumb"
+        )
+
+    def resolve_transition(self, screen: Screen | str, from_screen: Screen = None):
+        resolver = self._transition_resolver
+        if resolver is None or resolver.transitions is not self.TRANSITIONS:
+            resolver = self._transition_resolver = TransitionResolver(self.TRANSITIONS)
+        return resolver.resolve(from_screen or self.screen, screen)
+
+    @property
+    def transition_scheduler(self) -> TransitionScheduler:
+        scheduler = self._transition_scheduler
+        if scheduler is None:
+            scheduler = self._transition_scheduler = TransitionScheduler(
+                self, self.TRANSITION_POLICY, self.TRANSITION_QUEUE_DEPTH
+            )
+        return scheduler
+
+    @property
+    def snapshot_cache(self) -> SnapshotCache:
+        cache = self._snapshot_cache
+        if cache is None:
+            cache = self._snapshot_cache = SnapshotCache(self.SNAPSHOT_CACHE_BYTES)
+        return cache
+
+    @property
+    def pushed_transitions(self) -> WeakKeyDictionary:
+        """The transition each screen on the stack was pushed with, to reverse on pop."""
+        transitions = self._pushed_transitions
+        if transitions is None:
+            transitions = self._pushed_transitions = WeakKeyDictionary()
+        return transitions
+
     def handle_transitions(self, screen: Screen):
         from_screen = self.screen
-        to_screen = screen
-        self.from_screen_info = None
-        self.transition = None
-        if not isinstance(screen, TransitionScreen):
-            keys = []
-            if isinstance(screen, str):
-                keys = ((from_screen.id, to_screen), (type(from_screen), to_screen))
-            elif issubclass(type(screen), Screen):
-                keys = (
-                    (from_screen.id, to_screen.id),
-                    (type(from_screen), to_screen.id),
-                    (from_screen.id, type(to_screen)),
-                    (type(from_screen), type(to_screen)),
-                )
-            for key in keys:
-                if key in self.TRANSITIONS:
-                    self.transition = self.TRANSITIONS[key]
-                    break
-
-            if self.transition:
-                self.log(f"found a transition: {self.transition=} {key=}")
-                self.from_screen_info = self.save_screen()
-            else:
-                self.log(f"transition not found")
+        if isinstance(screen, TransitionScreen):
+            self.transition = None
+            return
+
+        pending = self.pending_snapshot
+        if pending is not None:
+            # The last transition hasn't started, so its destination was never seen.
+            # Coalesce: transition from the screen that was last on display instead.
+            from_screen = pending.screen
+        self.transition = self.resolve_transition(screen, from_screen)
 
-        self.log(f"pushing screen {from_screen=} --> {to_screen=}")
+        if self.transition:
+            self.pending_snapshot = pending or self.snapshot_cache.snapshot(
+                self.screen, self.size
+            )
+        else:
+            self.pending_snapshot = None
+
+    def handle_pop_transitions(self):
+        stack = self.screen_stack
+        if len(stack) < 2 or isinstance(self.screen, TransitionScreen):
+            self.transition = self.pending_snapshot = None
+            return
+        revealed = stack[-2]
+        pending = self.pending_snapshot
+        on_display = self.screen if pending is None else pending.screen
+        pushed = self.pushed_transitions
+        transition = None
+        if on_display is not revealed:
+            if on_display is self.screen and on_display in pushed:
+                # Play the transition this screen was pushed with, backwards
+                transition = pushed[on_display]
+            else:
+                # Play the transition that leads here from the revealed screen,
+                # backwards
+                transition = self.resolve_transition(on_display, revealed)
+        pushed.pop(self.screen, None)
+        if transition:
+            self.transition = TransitionSpec.parse(transition).reversed()
+            self.pending_snapshot = pending or self.snapshot_cache.snapshot(
+                self.screen, self.size
+            )
+        else:
+            self.transition = self.pending_snapshot = None
 
     def push_screen(self, screen: Screen):
+        if self.transition_scheduler.intercept(self.push_screen, screen):
+            return
+        pending = self.pending_snapshot
+        covered = self.screen if pending is None else pending.screen
         self.handle_transitions(screen)
         super().push_screen(screen)
-        self.log(f"pushed screen {self.screen=}")
+        if covered is self.screen_stack[-2] and not isinstance(
+            self.screen, TransitionScreen
+        ):
+            # The transition went from the screen below, so it can be undone on pop
+            self.pushed_transitions[self.screen] = self.transition
 
     def switch_screen(self, screen: Screen):
+        if self.transition_scheduler.intercept(self.switch_screen, screen):
+            return
         self.handle_transitions(screen)
+        if self.pending_snapshot is not None:
+            # The current screen is about to be detached, so it must render now
+            self._snapshot("capture", self.pending_snapshot.capture)
+        # Neither screen was pushed over the one below it
+        self.pushed_transitions.pop(self.screen, None)
         super().switch_screen(screen)
-        self.log(f"switched screen {self.screen=}")
+        self.pushed_transitions.pop(self.screen, None)
 
-    def screen_showed(self):
-        self.log(f"screen showed {self.screen=}")
-        self.log(f"screens {self.screen_stack=}")
-        if self.transition:
-            to_screen_info = self.save_screen()
-            self.push_screen(
-                TransitionScreen(
-                    transition=self.transition,
-                    from_screen=self.from_screen_info,
-                    to_screen=to_screen_info,
-                )
+    def pop_screen(self) -> Screen | None:
+        """Pop the current screen, as `App.pop_screen` does.
+
+        Returns the screen that was replaced, or None if a transition is playing and
+        the pop has been queued until it ends (see `TRANSITION_POLICY`).
+        """
+        if self.transition_scheduler.intercept(self.pop_screen):
+            return None
+        self.handle_pop_transitions()
+        if self.pending_snapshot is not None:
+            # The popped screen is removed, so it must render now
+            self._snapshot("capture", self.pending_snapshot.capture)
+        return super().pop_screen()
+
+    def screen_showed(self, screen: Screen = None, strips=None):
+        """Start the pending transition to `screen`, now that it has been laid out.
+
+        `strips` is the screen's first full render, if it was held back for this.
+        """
+        if screen is not None and screen is not self.screen:
+            # A screen that was replaced before it could be shown
+            return
+        pending = self.pending_snapshot
+        self.pending_snapshot = None
+        if self.transition and pending is not None:
+            # Only rendering has to happen here; the rest is done in a worker
+            to_snapshot = self.snapshot_cache.snapshot(self.screen, self.size, strips)
+            self._snapshot("from", pending.capture)
+            self._snapshot("to", to_snapshot.capture)
+            self.transition_scheduler.schedule(
+                self.transition,
+                pending,
+                to_snapshot,
+                self.PRECOMPUTE_FRAMES,
+                self.TRANSITION_PREPARE_DEADLINE,
             )
 
-        else:
-            self.from_screen_info = None
-
-    def save_screen(self) -> None:
-        width, height = self.size
-        console = Console(
-            width=width,
-            height=height,
-            file=io.StringIO(),
-            force_terminal=True,
-            color_system="truecolor",
-            record=True,
-            legacy_windows=False,
+    def _snapshot(self, stage, capture):
+        instruments = self.instruments
+        if instruments is None:
+            return capture()
+        start = perf_counter()
+        result = capture()
+        instruments.emit(
+            "snapshot",
+            TransitionSpec.parse(self.transition).effect,
+            stage=stage,
+            seconds=perf_counter() - start,
         )
+        return result
+
+    def _display(self, screen: Screen, renderable) -> None:
+        pending = self.pending_snapshot
+        if (
+            pending is not None
+            and screen is self.screen
+            and screen is not pending.screen
+        ):
+            # The destination of a transition isn't displayed. Its first full render
+            # is the snapshot to transition to, so it doesn't have to render again.
+            if isinstance(renderable, LayoutUpdate):
+                self.screen_showed(screen, renderable.strips)
+            return
+        cache = self._snapshot_cache
+        if cache is not None and renderable is not None:
+            # Whatever changed may not be in the screen's cached snapshot
+            cache.changed(screen)
+        scheduler = self._transition_scheduler
+        if scheduler is None:
+            return super()._display(screen, renderable)
+        if screen is scheduler.preparing:
+            # Held back until its transition starts, or is given up on
+            return
+        if screen is not scheduler.screen:
+            return super()._display(screen, renderable)
+        container = screen.container
+        # Nothing is drawn without a renderable, so the scroll waits for one
+        scroll = None if renderable is None else container.take_scroll()
+        if scroll is not None and not isinstance(renderable, LayoutUpdate):
+            region, rows = scroll
+            if region.x == 0 and region.width == self.size.width:
+                # Scrolled within the same synchronized update the new rows are in
+                self._begin_update()
+                self.console.file.write(scroll_terminal(region, rows))
+            else:
+                # Only whole rows of the terminal scroll, so repaint instead
+                renderable = screen._compositor.render(full=True)
+        budget = container.frame_budget
+        if budget is None or not budget.sampling:
+            return super()._display(screen, renderable)
+        # Writing the frame counts towards its cost
+        start = perf_counter()
+        super()._display(screen, renderable)
+        budget.add(perf_counter() - start)
+
+    def save_screen(self) -> ScreenInfo:
+        # Keep the compositor's segments as they are, rather than exporting to ANSI
+        # and parsing the result back in to Text
         screen_render = self.screen._compositor.render(full=True)
-        console.print(screen_render)
-        text = console.export_text(styles=True)
-        self.log(f"Length from app: {self.screen=}: {len(text)=}")
-        return ScreenInfo(size=self.size, content=text, screen=self.screen)
+        return ScreenInfo.from_strips(self.size, screen_render.strips, self.screen)
@@ -0,0 +1,192 @@
+"""Vectorised colour blending for cross-fade and dissolve transitions.
+
+This engine backs `ArrayCrossFade` and `ArrayDissolve`. The pure-Python effects
+in `transitions.effects` blend once per pair of styles rather than once per run
+of cells, which is faster on screens with few styles; they switch to this engine
+on screens with many styles, when NumPy is installed.
+"""
+
+from rich.cells import cell_len
+from rich.color import Color
+from rich.segment import Segment
+from rich.style import Style
+from textual.strip import Strip
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class SnapshotArrays:
+    """A screen snapshot as per-cell arrays.
+
+    `chars` holds the text of each cell ("" for the second cell of a wide
+    character), `fg` and `bg` hold RGB colours with `has_fg` and `has_bg` false where
+    the colour is the terminal default, and `base` indexes a table of the remaining
+    (non-colour) style attributes.
+    """
+
+    def __init__(self, lines, size, base_styles):
+        width, height = size
+        self.chars = numpy.full((height, width), " ", dtype=object)
+        self.fg = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.bg = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        self.has_fg = numpy.zeros((height, width), dtype=bool)
+        self.has_bg = numpy.zeros((height, width), dtype=bool)
+        self.base = numpy.zeros((height, width), dtype=numpy.int64)
+        self.continuation = numpy.zeros((height, width), dtype=bool)
+
+        colours = {}
+        for y, line in enumerate(lines[:height]):
+            x = 0
+            for text, style, control in line:
+                if control or not text:
+                    continue
+                style = style or Style.null()
+                key = colours.get(style)
+                if key is None:
+                    key = colours[style] = (
+                        style.color and style.color.get_truecolor(),
+                        style.bgcolor and style.bgcolor.get_truecolor(),
+                        base_styles.setdefault(style.without_color, len(base_styles)),
+                    )
+                fg, bg, base = key
+                start = x
+                for character in text:
+                    character_width = cell_len(character)
+                    if character_width == 0 and x > 0:
+                        self.chars[y, x - 1] += character
+                        continue
+                    if x + character_width > width:
+                        break
+                    self.chars[y, x] = character
+                    if character_width == 2:
+                        self.chars[y, x + 1] = ""
+                        self.continuation[y, x + 1] = True
+                    x += character_width
+                end = x
+                if fg is not None:
+                    self.fg[y, start:end] = fg
+                    self.has_fg[y, start:end] = True
+                if bg is not None:
+                    self.bg[y, start:end] = bg
+                    self.has_bg[y, start:end] = True
+                self.base[y, start:end] = base
+
+
+class BlendEngine:
+    """Computes blended frames between two snapshots with vectorised operations."""
+
+    def __init__(self, from_screen, to_screen, seed=None):
+        self.width, self.height = from_screen.size
+        base_styles = {}
+        self.from_arrays = SnapshotArrays(
+            from_screen.lines, from_screen.size, base_styles
+        )
+        self.to_arrays = SnapshotArrays(to_screen.lines, from_screen.size, base_styles)
+        self.base_styles = list(base_styles)
+        thresholds = numpy.random.default_rng(seed).random((self.height, self.width))
+        # Both halves of a wide character (in either screen) share a threshold, so
+        # they always come from the same screen
+        continuation = (
+            self.from_arrays.continuation | self.to_arrays.continuation
+        ).ravel()
+        leads = numpy.arange(continuation.size)
+        leads[continuation] = 0
+        leads = numpy.maximum.accumulate(leads)
+        self.thresholds = thresholds.ravel()[leads].reshape(thresholds.shape)
+        self._styles = {}
+
+    def cross_fade(self, progress):
+        """Background moves from old to new, text fades out and in through it."""
+        source, target = self.from_arrays, self.to_arrays
+        bg, has_bg = self.blend(
+            source.bg, source.has_bg, target.bg, target.has_bg, progress
+        )
+        if progress < 0.5:
+            fg, has_fg = self.blend(source.fg, source.has_fg, bg, has_bg, progress * 2)
+            return self.emit(source.chars, fg, has_fg, bg, has_bg, source.base)
+        fg, has_fg = self.blend(bg, has_bg, target.fg, target.has_fg, progress * 2 - 1)
+        return self.emit(target.chars, fg, has_fg, bg, has_bg, target.base)
+
+    def dissolve(self, progress):
+        """Each cell switches from the old screen to the new one at a random time."""
+        source, target = self.from_arrays, self.to_arrays
+        mask = self.thresholds < progress
+        mask3 = mask[..., None]
+        return self.emit(
+            numpy.where(mask, target.chars, source.chars),
+            numpy.where(mask3, target.fg, source.fg),
+            numpy.where(mask, target.has_fg, source.has_fg),
+            numpy.where(mask3, target.bg, source.bg),
+            numpy.where(mask, target.has_bg, source.has_bg),
+            numpy.where(mask, target.base, source.base),
+        )
+
+    @staticmethod
+    def blend(from_rgb, from_has, to_rgb, to_has, progress):
+        blended = (
+            from_rgb + (to_rgb.astype(numpy.float32) - from_rgb) * progress
+        ).astype(numpy.uint8)
+        # A default colour can't be blended, so it is swapped at the halfway point
+        both = (from_has & to_has)[..., None]
+        swapped = from_rgb if progress < 0.5 else to_rgb
+        has = (from_has & to_has) | (from_has if progress < 0.5 else to_has)
+        return numpy.where(both, blended, swapped), has
+
+    def emit(self, chars, fg, has_fg, bg, has_bg, base):
+        """Convert per-cell arrays to strips, with one segment per run of equal style."""
+        fg = fg.astype(numpy.int64)
+        bg = bg.astype(numpy.int64)
+        fg_key = (fg[..., 0] << 16 | fg[..., 1] << 8 | fg[..., 2]) | (
+            has_fg.astype(numpy.int64) << 24
+        )
+        fg_key |= base << 25
+        bg_key = (bg[..., 0] << 16 | bg[..., 1] << 8 | bg[..., 2]) | (
+            has_bg.astype(numpy.int64) << 24
+        )
+        changes = numpy.zeros((self.height, self.width), dtype=bool)
+        changes[:, 0] = True
+        changes[:, 1:] = (fg_key[:, 1:] != fg_key[:, :-1]) | (
+            bg_key[:, 1:] != bg_key[:, :-1]
+        )
+        # Gather every run start in one go, so Python only loops over runs
+        run_rows, run_columns = numpy.nonzero(changes)
+        run_fg = fg_key[run_rows, run_columns].tolist()
+        run_bg = bg_key[run_rows, run_columns].tolist()
+        run_columns = run_columns.tolist()
+        run_counts = changes.sum(axis=1).tolist()
+        rows = chars.tolist()
+
+        styles = self._styles
+        get_style = self.get_style
+        width = self.width
+        join = "".join
+        strips = []
+        run = 0
+        for row, count in zip(rows, run_counts):
+            segments = []
+            for index in range(run, run + count):
+                start = run_columns[index]
+                end = run_columns[index + 1] if index + 1 < run + count else width
+                key = (run_fg[index], run_bg[index])
+                style = styles.get(key) or get_style(*key)
+                segments.append(Segment(join(row[start:end]), style))
+            strips.append(Strip(segments, width))
+            run += count
+        return strips
+
+    def get_style(self, fg_key, bg_key):
+        style = self._styles.get((fg_key, bg_key))
+        if style is None:
+            style = self._styles[fg_key, bg_key] = self.base_styles[
+                fg_key >> 25
+            ] + Style.from_color(_key_color(fg_key), _key_color(bg_key))
+        return style
+
+
+def _key_color(key):
+    if not key & 1 << 24:
+        return None
+    return Color.from_rgb(key >> 16 & 0xFF, key >> 8 & 0xFF, key & 0xFF)
@@ -0,0 +1,292 @@
+"""Headless benchmarks for transition rendering.
+
+Every offset of each transition is rendered by a TransitionContainer, and the
+changed region of each frame is encoded as the terminal would receive it.
+Results are written as JSON, so runs can be compared to catch regressions:
+
+    python -m transitions.benchmark --output before.json
+
+Snapshots are synthetic by default. `--recorded` captures them from the demo app
+instead, which has to be run from the repository root to find its images.
+`--diff` runs transitions in diff mode, between synthetic screens that share
+their top and bottom quarters. Morph floats synthetic regions across its
+cross-fade, as no widgets are mounted to float.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import tracemalloc
+from random import Random
+from statistics import quantiles
+from time import perf_counter
+
+from rich.color import Color
+from rich.console import Console
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Region
+from textual.strip import Strip
+
+from .effects import EFFECTS
+from .lines import CropLine
+from .widgets.screen import Floaty, ScreenInfo, TransitionContainer
+
+SIZES = ((80, 24), (120, 40), (200, 60), (400, 120))
+TRANSITIONS = (
+    "slide_up",
+    "slide_down",
+    "slideover_up",
+    "slideover_down",
+    "wipe_up",
+    "wipe_down",
+    "slide_left",
+    "slide_right",
+    "slideover_left",
+    "slideover_right",
+    "wipe_left",
+    "wipe_right",
+    "fade_up",
+    "dissolve",
+    "morph",
+)
+WORDS = ("textual", "transition", "screen", "widget", "漢字", "rich", "│", "██")
+
+
+def synthetic_snapshot(size, seed) -> ScreenInfo:
+    """A screen of randomly styled words, including some wide characters."""
+    random = Random(seed)
+    width, height = size
+    styles = [
+        Style(
+            color=Color.from_rgb(*(random.randrange(256) for _ in range(3))),
+            bgcolor=Color.from_rgb(*(random.randrange(256) for _ in range(3))),
+            bold=random.random() < 0.2,
+        )
+        for _ in range(16)
+    ]
+    strips = []
+    for _ in range(height):
+        segments = []
+        remaining = width
+        while remaining:
+            text = f"{random.choice(WORDS)} "
+            if Segment(text).cell_length > remaining:
+                text = " " * remaining
+            segments.append(Segment(text, random.choice(styles)))
+            remaining -= Segment(text).cell_length
+        strips.append(Strip(segments, width))
+    return ScreenInfo.from_strips(size, strips)
+
+
+def share_edges(from_screen, to_screen) -> ScreenInfo:
+    """The to-screen, with the top and bottom quarters of the from-screen."""
+    height = from_screen.size[1]
+    edge = height // 4
+    from_lines = from_screen.lines
+    to_lines = to_screen.lines
+    return ScreenInfo.from_strips(
+        to_screen.size,
+        from_lines[:edge]
+        + to_lines[edge : height - edge]
+        + from_lines[height - edge :],
+    )
+
+
+def synthetic_floaties(from_screen, to_screen) -> tuple[Floaty, ...]:
+    """Regions floated across a morph: one moved, one moved and resized."""
+    width, height = from_screen.size
+    regions = (
+        (
+            Region(0, 0, width // 2, height // 3),
+            Region(width // 2, height // 2, width // 2, height // 3),
+        ),
+        (
+            Region(width * 3 // 4, 1, width // 5, height // 3),
+            Region(width // 8, height // 2, width // 3, height // 4),
+        ),
+    )
+    return tuple(
+        Floaty.crop(from_screen.lines, to_screen.lines, start, end)
+        for start, end in regions
+    )
+
+
+async def record_snapshots(size) -> tuple[ScreenInfo, ScreenInfo]:
+    """Snapshots of two demo screens, rendered headlessly."""
+    from .demo import DemoApp, DirectionScreen
+
+    app = DemoApp()
+    async with app.run_test(size=size) as pilot:
+        await pilot.pause(0.5)
+        from_screen = app.save_screen()
+        app.switch_screen(DirectionScreen("slide_up"))
+        while app.transition_scheduler.active or app.pending_snapshot is not None:
+            await pilot.pause(0.1)
+        await pilot.pause(0.5)
+        to_screen = app.save_screen()
+    return from_screen, to_screen
+
+
+def encode(console, frame, region) -> int:
+    """The number of bytes needed to write a region of a frame."""
+    x, y, width, height = region
+    buffer = []
+    for strip in frame[y : y + height]:
+        buffer.extend(CropLine(strip).crop(x, x + width))
+        buffer.append(Segment.line())
+    return len(console._render_buffer(buffer).encode("utf-8"))
+
+
+def play(container, console):
+    """Render every offset of a transition, returning per-frame times and bytes."""
+    effect = container.effect
+    full = (0, 0, container.width, container.height)
+    times = []
+    sizes = []
+    for offset in range(1, effect.end + 1):
+        start = perf_counter()
+        damage = effect.damage(container.rendered_offset, offset)
+        if container.floaties:
+            moved = container.move_floaties(offset / effect.end)
+            if damage is not None and moved is not None:
+                damage = damage.union(moved)
+        container.rendered_offset = offset
+        frame = container.render_strips()
+        sizes.append(encode(console, frame, full if damage is None else damage))
+        times.append(perf_counter() - start)
+    return times, sizes
+
+
+def create_container(transition, from_screen, to_screen, precompute, diff):
+    container = TransitionContainer(
+        from_screen, to_screen, transition, precompute, diff=diff
+    )
+    if precompute:
+        # Frames are rendered before the transition starts, by `prepare_transition`
+        container.timeline.precompute()
+    if transition == "morph":
+        container.floaties = synthetic_floaties(from_screen, to_screen)
+    return container
+
+
+def run_transition(
+    transition, from_screen, to_screen, precompute=False, diff=False
+) -> dict:
+    width, height = from_screen.size
+    console = Console(
+        file=io.StringIO(),
+        width=width,
+        height=height,
+        force_terminal=True,
+        color_system="truecolor",
+        legacy_windows=False,
+    )
+    # Setting up an effect is part of the cost of a transition, so it is timed too
+    start = perf_counter()
+    container = create_container(transition, from_screen, to_screen, precompute, diff)
+    setup = perf_counter() - start
+    times, sizes = play(container, console)
+
+    # Allocations are measured on a second run, as tracing skews the timings
+    tracemalloc.start()
+    container = create_container(transition, from_screen, to_screen, precompute, diff)
+    play(container, console)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    milliseconds = [time * 1000 for time in times]
+    percentiles = quantiles(milliseconds, n=100, method="inclusive")
+    return {
+        "transition": transition,
+        "frames": len(times),
+        "setup_ms": setup * 1000,
+        "frame_ms": {
+            "p50": percentiles[49],
+            "p90": percentiles[89],
+            "p99": percentiles[98],
+            "max": max(milliseconds),
+            "mean": sum(milliseconds) / len(milliseconds),
+        },
+        "allocated_peak_bytes": peak,
+        "allocated_retained_bytes": retained,
+        "bytes_emitted": sum(sizes),
+        "bytes_per_frame": sum(sizes) / len(sizes),
+    }
+
+
+def run(
+    sizes=SIZES, transitions=TRANSITIONS, recorded=False, precompute=False, diff=False
+):
+    results = []
+    for size in sizes:
+        if recorded:
+            from_screen, to_screen = asyncio.run(record_snapshots(size))
+        else:
+            from_screen = synthetic_snapshot(size, 1)
+            to_screen = synthetic_snapshot(size, 2)
+            if diff:
+                to_screen = share_edges(from_screen, to_screen)
+        for transition in transitions:
+            result = run_transition(
+                transition, from_screen, to_screen, precompute, diff
+            )
+            result["size"] = list(size)
+            result["snapshots"] = "recorded" if recorded else "synthetic"
+            results.append(result)
+            print(
+                f"{size[0]}x{size[1]} {transition:<16} "
+                f"p50 {result['frame_ms']['p50']:7.2f}ms "
+                f"p99 {result['frame_ms']['p99']:7.2f}ms "
+                f"{result['bytes_per_frame']:9.0f} bytes/frame",
+                file=sys.stderr,
+            )
+    return {"precompute": precompute, "diff": diff, "results": results}
+
+
+def parse_size(size):
+    width, _, height = size.partition("x")
+    return int(width), int(height)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [parse_size(size) for size in sizes.split(",")],
+        default=SIZES,
+        help="comma separated WIDTHxHEIGHT sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--transitions",
+        type=lambda names: names.split(","),
+        default=TRANSITIONS,
+        help="comma separated transition names (default: all)",
+    )
+    parser.add_argument("--recorded", action="store_true")
+    parser.add_argument("--precompute", action="store_true")
+    parser.add_argument("--diff", action="store_true")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    options = parser.parse_args(args)
+
+    unknown = set(options.transitions) - set(EFFECTS)
+    if unknown:
+        parser.error(f"unknown transitions: {', '.join(sorted(unknown))}")
+    report = run(
+        options.sizes,
+        options.transitions,
+        options.recorded,
+        options.precompute,
+        options.diff,
+    )
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
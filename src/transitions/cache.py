@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from sys import getsizeof
+from weakref import WeakKeyDictionary
+
+from .snapshot import PendingSnapshot
+from .widgets.screen import ScreenInfo
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def snapshot_bytes(screen_info: ScreenInfo) -> int:
+    """Roughly the memory held by a snapshot. Styles are shared, so aren't counted."""
+    size = getsizeof(screen_info.runs) + getsizeof(screen_info.styles)
+    for indexes, texts in screen_info.runs:
+        size += getsizeof(indexes) + getsizeof(texts) + sum(map(getsizeof, texts))
+    return size
+
+
+class SnapshotCache:
+    """The most recently used snapshots of screens, up to `max_bytes` in total.
+
+    Snapshots are keyed by screen and size. Each screen has a generation, which the
+    app bumps whenever the screen's compositor renders a change; a snapshot taken
+    at an earlier generation is stale, and is dropped when next looked up.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (id(screen), size) -> (generation, bytes, ScreenInfo)
+        self._entries = OrderedDict()
+        self._generations = WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def changed(self, screen):
+        self._generations[screen] = self._generations.get(screen, 0) + 1
+
+    def get(self, screen, size) -> ScreenInfo | None:
+        key = (id(screen), size)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        generation, _, screen_info = entry
+        # Ids are reused once a screen is collected, so check it's the same screen
+        current = self._generations.get(screen, 0)
+        if screen_info.screen is not screen or generation != current:
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return screen_info
+
+    def snapshot(self, screen, size, strips=None) -> PendingSnapshot:
+        """A snapshot of `screen`, which costs nothing if it's cached."""
+        screen_info = self.get(screen, size)
+        if screen_info is not None:
+            return PendingSnapshot(screen, size, screen_info=screen_info)
+        snapshot = PendingSnapshot(screen, size, strips=strips)
+        snapshot.generation = self._generations.get(screen, 0)
+        return snapshot
+
+    def store(self, snapshot: PendingSnapshot):
+        """Cache a materialised snapshot that came from `snapshot`."""
+        if snapshot.generation is None or snapshot.screen is None:
+            return
+        screen_info = snapshot.materialise()
+        size = snapshot_bytes(screen_info)
+        if size > self.max_bytes:
+            return
+        key = (id(snapshot.screen), snapshot.size)
+        self._discard(key)
+        self._entries[key] = (snapshot.generation, size, screen_info)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
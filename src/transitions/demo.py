@@ -3,12 +3,11 @@ from random import choice
 from pathlib import Path
 import io
 from .app import TransitionsApp
-from .widgets.screen import TransitionScreen, LiquidScreen, Floaty
+from .widgets.screen import LiquidScreen
 
 
 from textual.events import Event
 from textual.screen import Screen
-from textual.widget import Widget
 from textual.widgets import Label, Static, Checkbox, Button, TextLog
 from textual.containers import Vertical, Horizontal
 from textual.app import ComposeResult
@@ -223,43 +222,6 @@ class MorphScreenOne(LiquidScreen):
         for doc in Path("./docs/").glob("*.md"):
             yield Title(doc.stem, id=doc.stem)
 
-    def mount_this(self, title: Title):
-        self.app.log("floating")
-        layers = list(self.styles.layers)
-        if "slider" not in layers:
-            layers.append("slider")
-        self.styles.layers = tuple(layers)
-        self.old_title = title
-        self.new_title = Floaty(title, title.renderable)
-        self.new_title.styles.layer = "slider"
-
-        self.mount(self.new_title)
-
-    def float_this(self, title):
-        if hasattr(self, "new_title") and self.new_title is title:
-            self.new_title.animate(
-                "offset_x",
-                self.heading.region.x,
-                duration=1,
-            )
-            self.new_title.animate(
-                "offset_y",
-                self.heading.region.y,
-                duration=1,
-                on_complete=lambda: self.app.push_screen(MorphScreenTwo()),
-            )
-            self.new_title.styles.width = self.new_title.region.width
-            self.new_title.styles.animate(
-                "width",
-                self.heading.region.width,
-                duration=1,
-            )
-            for title in self.query(Widget):
-                if title is self.new_title:
-                    continue
-                title.styles.animate("opacity", 0.05, duration=1)
-            self.styles.animate("opacity", 0.10, duration=1)
-
 
 class DemoApp(TransitionsApp):
     CSS_PATH = "transitions.css"
@@ -268,59 +230,30 @@ class DemoApp(TransitionsApp):
     def on_mount(self):
         self.push_screen(DirectionScreen("up"))
 
-    def handle_transitions(self, screen: Screen):
-
-        from_screen = self.screen
-        to_screen = screen
-        self.from_screen_info = None
-        self.transition = None
-        if not isinstance(screen, TransitionScreen):
-            keys = []
-            if isinstance(screen, str):
-                keys = ((from_screen.id, to_screen), (type(from_screen), to_screen))
-            elif issubclass(type(screen), Screen):
-                keys = (
-                    (from_screen.id, to_screen.id),
-                    (type(from_screen), to_screen.id),
-                    (from_screen.id, type(to_screen)),
-                    (type(from_screen), type(to_screen)),
-                )
-            for key in keys:
-                if key in self.TRANSITIONS:
-                    self.transition = self.TRANSITIONS[key]
-                    break
-
-            if self.transition:
-                self.log(f"found a transition: {self.transition=} {key=}")
-                self.from_screen_info = self.save_screen()
+    def resolve_transition(self, screen: Screen, from_screen: Screen = None):
+        transition = super().resolve_transition(screen, from_screen)
+        from_screen = from_screen or self.screen
+
+        ### Faking it for the demo
+        if not from_screen.id == "_default":
+            self.log("faking transaction for demo")
+
+            if from_screen.__class__.__name__ in (
+                "MorphScreenOne",
+                "MorphScreenTwo",
+            ) and screen.__class__.__name__ in (
+                "MorphScreenOne",
+                "MorphScreenTwo",
+            ):
+                self.log("It's morbin time!")
+                transition = "morph"
             else:
-                self.log(f"transition not found")
-
-            ### Ignore all the above
-            ### Faking it for the demo
-            if not self.screen.id == "_default":
-                self.log("faking transaction for demo")
-                self.from_screen_info = self.save_screen()
-
-                if self.screen.__class__.__name__ in (
-                    "MorphScreenOne",
-                    "MorphScreenTwo",
-                ) and to_screen.__class__.__name__ in (
-                    "MorphScreenOne",
-                    "MorphScreenTwo",
-                ):
-                    self.log("It's morbin time!")
-                    self.transition = "morph"
-                else:
-                    self.log(to_screen.direction)
-                    transition_type = (
-                        type(self.screen).__name__.replace("Screen", "").lower()
-                    )
-                    self.transition = to_screen.direction
-                    self.log(self.transition)
-
-            ### Faking it for the demo
-        self.log(f"pushing screen {from_screen=} --> {to_screen=}")
+                self.log(screen.direction)
+                transition = screen.direction
+                self.log(transition)
+
+        ### Faking it for the demo
+        return transition
 
 
 if __name__ == "__main__":
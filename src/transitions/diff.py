@@ -0,0 +1,130 @@
+from textual.geometry import Region, Size
+from textual.strip import Strip
+
+from .effects import Effect, get_effect
+from .lines import CropLine, align_segments
+
+
+def create_effect(name, from_screen, to_screen, diff=False) -> Effect:
+    effect_class = get_effect(name)
+    if diff:
+        return DiffEffect(effect_class, from_screen, to_screen)
+    return effect_class(from_screen, to_screen)
+
+
+def changed_region(from_screen, to_screen) -> Region:
+    """The smallest region holding every cell that differs between two snapshots.
+
+    Lines are compared by hash, and only lines that differ are compared cell by cell.
+    """
+    rows = [
+        y
+        for y, (from_hash, to_hash) in enumerate(
+            zip(from_screen.line_hashes, to_screen.line_hashes)
+        )
+        if from_hash != to_hash
+    ]
+    if not rows:
+        return Region()
+    from_lines = from_screen.lines
+    to_lines = to_screen.lines
+    width = from_screen.size[0]
+    top = bottom = None
+    left, right = width, 0
+    for y in rows:
+        x = 0
+        for from_segment, to_segment in align_segments(from_lines[y], to_lines[y]):
+            length = from_segment.cell_length
+            if from_segment != to_segment:
+                left = min(left, x)
+                right = max(right, x + length)
+                bottom = y
+                if top is None:
+                    top = y
+            x += length
+    if top is None:
+        # The lines were split in to segments differently, but the cells match
+        return Region()
+    return Region(left, top, right - left, bottom - top + 1)
+
+
+class Crop:
+    """A region of a snapshot, which can stand in for a snapshot in an effect."""
+
+    __slots__ = ["size", "lines"]
+
+    def __init__(self, lines, region):
+        x, y, width, height = region
+        self.size = Size(width, height)
+        self.lines = tuple(
+            Strip(CropLine(line).crop(x, x + width), width)
+            for line in lines[y : y + height]
+        )
+
+
+class DiffEffect(Effect):
+    """Runs an effect over just the region that differs between two snapshots.
+
+    Everything outside that region is the same on both screens, so it stays where
+    it is, and as damage only covers the region it is never written out again.
+    """
+
+    def __init__(self, effect_class, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        self.region = region = changed_region(from_screen, to_screen)
+        self.effect = None
+        if region:
+            self.effect = effect_class(
+                Crop(self.from_lines, region), Crop(self.to_lines, region)
+            )
+        x, y, width, height = region
+        band = [CropLine(line) for line in self.from_lines[y : y + height]]
+        self.left = tuple(line.crop(0, x) for line in band)
+        self.right = tuple(line.crop(x + width, self.width) for line in band)
+
+    @property
+    def axis(self):
+        return self.effect.axis if self.effect else Effect.axis
+
+    @property
+    def morph(self):
+        return self.effect.morph if self.effect else False
+
+    @property
+    def duration(self):
+        # With nothing to animate, the transition ends at once
+        return self.effect.duration if self.effect else 0
+
+    @property
+    def end(self):
+        return self.effect.end if self.effect else 0
+
+    @property
+    def scroll(self):
+        # Terminals scroll whole rows, so the region must span the screen
+        if self.effect and self.region.width == self.width:
+            return self.effect.scroll
+        return 0
+
+    @property
+    def scroll_region(self):
+        return self.region
+
+    def frame(self, offset):
+        if self.effect is None:
+            return self.from_lines
+        y = self.region.y
+        lines = list(self.from_lines)
+        for row, (left, middle, right) in enumerate(
+            zip(self.left, self.effect.frame(offset), self.right)
+        ):
+            lines[y + row] = Strip([*left, *middle, *right], self.width)
+        return lines
+
+    def damage(self, old_offset, new_offset):
+        if self.effect is None:
+            return self.region
+        damage = self.effect.damage(old_offset, new_offset)
+        if damage is None:
+            return self.region
+        return damage.translate(self.region.offset)
@@ -0,0 +1,470 @@
+from random import Random
+
+from rich.cells import get_character_cell_size
+from rich.color import Color, blend_rgb
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Region
+from textual.strip import Strip
+
+from . import arrays
+from .lines import CropLine, pair_styles
+
+EFFECTS = {}
+DEFAULT_EFFECT = "slide_up"
+
+
+def register_effect(*names):
+    """Register an Effect class under one or more transition names."""
+
+    def register(effect_class):
+        for name in names:
+            EFFECTS[name] = effect_class
+        return effect_class
+
+    return register
+
+
+def get_effect(name):
+    return EFFECTS.get(name, EFFECTS[DEFAULT_EFFECT])
+
+
+REVERSE_DIRECTIONS = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+
+def reverse_effect(name):
+    """The effect that undoes an effect, e.g. "slide_down" for "slide_up"."""
+    base, _, direction = name.rpartition("_")
+    if base and direction in REVERSE_DIRECTIONS:
+        return f"{base}_{REVERSE_DIRECTIONS[direction]}"
+    return name
+
+
+class Effect:
+    """Produces the frames of a transition between two screen snapshots.
+
+    `axis` decides what `transition_offset` is animated to: the screen height for
+    "vertical" effects, the screen width for "horizontal" ones and 100 otherwise.
+    `duration` is the default length of the transition, in seconds. Effects whose
+    frames are the previous frame moved up by `scroll` rows per step of the offset
+    (down, if negative) can be played by scrolling the terminal.
+    """
+
+    axis = "vertical"
+    morph = False
+    duration = 2.0
+    scroll = 0
+
+    def __init__(self, from_screen, to_screen):
+        self.width, self.height = from_screen.size
+        self.from_lines = from_screen.lines
+        self.to_lines = to_screen.lines
+
+    @property
+    def end(self):
+        if self.axis == "vertical":
+            return self.height
+        if self.axis == "horizontal":
+            return self.width
+        return 100
+
+    def frame(self, offset):
+        raise NotImplementedError
+
+    @property
+    def scroll_region(self):
+        """The part of the frame that `scroll` applies to."""
+        return Region(0, 0, self.width, self.height)
+
+    def damage(self, old_offset, new_offset):
+        """The region that changes between two offsets, or None for the whole frame."""
+        return None
+
+    def row_band(self, start, end):
+        return Region(0, min(start, end), self.width, abs(end - start))
+
+    def column_band(self, start, end):
+        return Region(min(start, end), 0, abs(end - start), self.height)
+
+
+@register_effect("slide_up")
+class SlideUp(Effect):
+    scroll = 1
+
+    def __init__(self, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        self.lines = self.from_lines + self.to_lines
+
+    def frame(self, offset):
+        return self.lines[offset : offset + self.height]
+
+
+@register_effect("slide_down")
+class SlideDown(Effect):
+    scroll = -1
+
+    def __init__(self, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        self.lines = self.to_lines + self.from_lines
+
+    def frame(self, offset):
+        start = self.height - offset
+        return self.lines[start : start + self.height]
+
+
+@register_effect("slideover_up")
+class SlideOverUp(Effect):
+    def frame(self, offset):
+        return self.from_lines[0 : self.height - offset] + self.to_lines[0:offset]
+
+
+@register_effect("slideover_down")
+class SlideOverDown(Effect):
+    def frame(self, offset):
+        return (
+            self.to_lines[self.height - offset : self.height]
+            + self.from_lines[offset : self.height]
+        )
+
+
+@register_effect("wipe_up")
+class WipeUp(Effect):
+    def frame(self, offset):
+        split = self.height - offset
+        return self.from_lines[0:split] + self.to_lines[split : self.height]
+
+    def damage(self, old_offset, new_offset):
+        return self.row_band(self.height - old_offset, self.height - new_offset)
+
+
+@register_effect("wipe_down")
+class WipeDown(Effect):
+    def frame(self, offset):
+        return self.to_lines[0:offset] + self.from_lines[offset : self.height]
+
+    def damage(self, old_offset, new_offset):
+        return self.row_band(old_offset, new_offset)
+
+
+class HorizontalEffect(Effect):
+    axis = "horizontal"
+
+    def __init__(self, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        self.from_crops = tuple(CropLine(line) for line in self.from_lines)
+        self.to_crops = tuple(CropLine(line) for line in self.to_lines)
+
+    def join_columns(self, left, left_start, left_end, right, right_start, right_end):
+        width = self.width
+        return [
+            Strip(
+                left_line.crop(left_start, left_end)
+                + right_line.crop(right_start, right_end),
+                width,
+            )
+            for left_line, right_line in zip(left, right)
+        ]
+
+
+@register_effect("slide_left")
+class SlideLeft(HorizontalEffect):
+    def frame(self, offset):
+        return self.join_columns(
+            self.from_crops, offset, self.width, self.to_crops, 0, offset
+        )
+
+
+@register_effect("slideover_left")
+class SlideOverLeft(HorizontalEffect):
+    def frame(self, offset):
+        return self.join_columns(
+            self.from_crops, 0, self.width - offset, self.to_crops, 0, offset
+        )
+
+
+@register_effect("wipe_left")
+class WipeLeft(HorizontalEffect):
+    def frame(self, offset):
+        split = self.width - offset
+        return self.join_columns(
+            self.from_crops, 0, split, self.to_crops, split, self.width
+        )
+
+    def damage(self, old_offset, new_offset):
+        return self.column_band(self.width - old_offset, self.width - new_offset)
+
+
+@register_effect("slide_right")
+class SlideRight(HorizontalEffect):
+    def frame(self, offset):
+        split = self.width - offset
+        return self.join_columns(
+            self.to_crops, split, self.width, self.from_crops, 0, split
+        )
+
+
+@register_effect("slideover_right")
+class SlideOverRight(HorizontalEffect):
+    def frame(self, offset):
+        return self.join_columns(
+            self.to_crops,
+            self.width - offset,
+            self.width,
+            self.from_crops,
+            offset,
+            self.width,
+        )
+
+
+@register_effect("wipe_right")
+class WipeRight(HorizontalEffect):
+    def frame(self, offset):
+        return self.join_columns(
+            self.to_crops, 0, offset, self.from_crops, offset, self.width
+        )
+
+    def damage(self, old_offset, new_offset):
+        return self.column_band(old_offset, new_offset)
+
+
+class CrossFade(Effect):
+    """Blends the colours of both snapshots, cell for cell.
+
+    Each line of a row is cut at the other's style boundaries (see `pair_styles`),
+    so every piece has one style from each screen. The background moves from the
+    old colour to the new one, while the old text fades in to the background over
+    the first half and the new text fades out of it over the second half. Blended
+    styles are computed once per (style pair, offset).
+    """
+
+    axis = "fade"
+    # Where NumPy is installed, screens with this many styles between them are
+    # blended faster by ArrayCrossFade
+    array_styles = 256
+
+    def __new__(cls, from_screen, to_screen):
+        if cls is CrossFade and use_arrays(from_screen, to_screen, cls.array_styles):
+            return ArrayCrossFade(from_screen, to_screen)
+        return super().__new__(cls)
+
+    def __init__(self, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        pair_indexes = {}
+        add_pair = pair_indexes.setdefault
+        self.from_rows = []
+        self.to_rows = []
+        for from_line, to_line in zip(self.from_lines, self.to_lines):
+            self.from_rows.append(
+                [
+                    (
+                        segment.text,
+                        add_pair((segment.style, to_style), len(pair_indexes)),
+                    )
+                    for segment, to_style in pair_styles(from_line, to_line)
+                ]
+            )
+            self.to_rows.append(
+                [
+                    (
+                        segment.text,
+                        add_pair((from_style, segment.style), len(pair_indexes)),
+                    )
+                    for segment, from_style in pair_styles(to_line, from_line)
+                ]
+            )
+        self.style_pairs = list(pair_indexes)
+        self._step_styles = {}
+
+    def styles_at(self, offset):
+        styles = self._step_styles.get(offset)
+        if styles is None:
+            styles = self._step_styles[offset] = [
+                blend_styles(from_style, to_style, offset / 100)
+                for from_style, to_style in self.style_pairs
+            ]
+        return styles
+
+    def frame(self, offset):
+        styles = self.styles_at(offset)
+        rows = self.from_rows if offset < 50 else self.to_rows
+        width = self.width
+        return [
+            Strip([Segment(text, styles[index]) for text, index in row], width)
+            for row in rows
+        ]
+
+
+def blend_colors(from_color, to_color, progress):
+    # A default colour can't be blended, so it is swapped at the halfway point
+    if from_color is None or to_color is None:
+        return from_color if progress < 0.5 else to_color
+    return Color.from_triplet(
+        blend_rgb(from_color.get_truecolor(), to_color.get_truecolor(), progress)
+    )
+
+
+def blend_styles(from_style, to_style, progress):
+    from_style = from_style or Style.null()
+    to_style = to_style or Style.null()
+    background = blend_colors(from_style.bgcolor, to_style.bgcolor, progress)
+    if progress < 0.5:
+        base = from_style
+        foreground = blend_colors(from_style.color, background, progress * 2)
+    else:
+        base = to_style
+        foreground = blend_colors(background, to_style.color, progress * 2 - 1)
+    return base + Style.from_color(foreground, background)
+
+
+class Dissolve(Effect):
+    """Switches each cell from the old screen to the new one at a random offset.
+
+    A wide character switches as a whole: cells are grouped in to the narrowest
+    spans that start and end on a character boundary in both screens, and each
+    span switches at once. Neighbouring cells with the same style are written as
+    one segment.
+    """
+
+    axis = "fade"
+    # As for CrossFade, but each frame costs the same for any number of styles, so
+    # the arrays only pay off on screens with far more of them
+    array_styles = 2048
+
+    def __new__(cls, from_screen, to_screen, seed=None):
+        if cls is Dissolve and use_arrays(from_screen, to_screen, cls.array_styles):
+            return ArrayDissolve(from_screen, to_screen, seed)
+        return super().__new__(cls)
+
+    def __init__(self, from_screen, to_screen, seed=None):
+        super().__init__(from_screen, to_screen)
+        random = Random(seed).random
+        width = self.width
+        self.rows = []
+        for from_line, to_line in zip(self.from_lines, self.to_lines):
+            from_cells = line_cells(from_line, width)
+            to_cells = line_cells(to_line, width)
+            row = []
+            start = 0
+            for end in range(1, width + 1):
+                # A span ends where neither screen continues a wide character
+                if end < width and (from_cells[end][0] == "" or to_cells[end][0] == ""):
+                    continue
+                row.append(
+                    (
+                        [cell for cell in from_cells[start:end] if cell[0]],
+                        [cell for cell in to_cells[start:end] if cell[0]],
+                        random(),
+                    )
+                )
+                start = end
+            self.rows.append(row)
+
+    def frame(self, offset):
+        progress = offset / 100
+        width = self.width
+        join = "".join
+        strips = []
+        for row in self.rows:
+            segments = []
+            add_segment = segments.append
+            text = []
+            add_text = text.append
+            run_style = None
+            for from_cells, to_cells, threshold in row:
+                for character, style in (
+                    to_cells if threshold < progress else from_cells
+                ):
+                    if style is not run_style and text:
+                        add_segment(Segment(join(text), run_style))
+                        text.clear()
+                    run_style = style
+                    add_text(character)
+            if text:
+                add_segment(Segment(join(text), run_style))
+            strips.append(Strip(segments, width))
+        return strips
+
+
+def line_cells(line, width):
+    """A (text, style) pair for each cell of a line, with "" for the second cell
+    of a wide character. Zero width characters join the character before them."""
+    cells = []
+    for text, style, control in line:
+        if control:
+            continue
+        for character in text:
+            character_width = get_character_cell_size(character)
+            if character_width == 0 and cells:
+                previous, previous_style = cells[-1 if cells[-1][0] else -2]
+                cells[-1 if cells[-1][0] else -2] = (
+                    previous + character,
+                    previous_style,
+                )
+                continue
+            cells.append((character, style))
+            if character_width == 2:
+                cells.append(("", style))
+    del cells[width:]
+    cells.extend((" ", None) for _ in range(width - len(cells)))
+    return cells
+
+
+def count_styles(screen) -> int:
+    styles = getattr(screen, "styles", None)
+    if styles is None:
+        # A crop of a snapshot (see `diff.Crop`) only has its lines
+        styles = {segment.style for line in screen.lines for segment in line}
+    return len(styles)
+
+
+def use_arrays(from_screen, to_screen, min_styles) -> bool:
+    """True if NumPy is installed, and the screens have `min_styles` between them."""
+    if arrays.numpy is None:
+        return False
+    return count_styles(from_screen) + count_styles(to_screen) >= min_styles
+
+
+class ArrayCrossFade(Effect):
+    """CrossFade computed with NumPy arrays, or CrossFade itself without NumPy."""
+
+    axis = "fade"
+
+    def __new__(cls, from_screen, to_screen):
+        if arrays.numpy is None:
+            return CrossFade(from_screen, to_screen)
+        return super().__new__(cls)
+
+    def __init__(self, from_screen, to_screen):
+        super().__init__(from_screen, to_screen)
+        self.engine = arrays.BlendEngine(from_screen, to_screen)
+
+    def frame(self, offset):
+        return self.engine.cross_fade(offset / 100)
+
+
+class ArrayDissolve(Effect):
+    """Dissolve computed with NumPy arrays, or Dissolve itself without NumPy."""
+
+    axis = "fade"
+
+    def __new__(cls, from_screen, to_screen, seed=None):
+        if arrays.numpy is None:
+            return Dissolve(from_screen, to_screen, seed)
+        return super().__new__(cls)
+
+    def __init__(self, from_screen, to_screen, seed=None):
+        super().__init__(from_screen, to_screen)
+        self.engine = arrays.BlendEngine(from_screen, to_screen, seed=seed)
+
+    def frame(self, offset):
+        return self.engine.dissolve(offset / 100)
+
+
+register_effect("fade_up", "fade_down", "fade_left", "fade_right")(CrossFade)
+register_effect("dissolve")(Dissolve)
+
+
+@register_effect("morph")
+class Morph(CrossFade):
+    morph = True
+    duration = 1.5
@@ -0,0 +1,64 @@
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, NamedTuple
+
+from textual import log
+
+
+class TransitionEvent(NamedTuple):
+    """Something that happened during a transition.
+
+    `name` is one of:
+
+    - "snapshot": a screen was captured, with the `stage` and the `seconds` taken.
+    - "start": a transition started, with its `duration`, `fps` and `size`.
+    - "frame": a frame was rendered at `offset`, taking `seconds`.
+    - "end": a transition ended, with the `frames_rendered`, the `frames_skipped`
+      as the offset hadn't moved, the `frames_dropped` short of the target rate,
+      the `seconds` taken, final `fps`, and whether it was `interrupted`.
+    """
+
+    name: str
+    transition: str | None
+    timestamp: float
+    data: dict[str, Any]
+
+
+Sink = Callable[[TransitionEvent], None]
+
+
+class Instruments:
+    """Sends transition events to sinks. Any callable taking an event is a sink."""
+
+    def __init__(self):
+        self.sinks: list[Sink] = []
+
+    def emit(self, name, transition=None, **data):
+        event = TransitionEvent(name, transition, monotonic(), data)
+        for sink in self.sinks:
+            sink(event)
+
+
+class RingBufferSink:
+    """Keeps the most recent events in memory."""
+
+    def __init__(self, size=1024):
+        self.events: deque[TransitionEvent] = deque(maxlen=size)
+
+    def __call__(self, event: TransitionEvent):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+
+class DevtoolsSink:
+    """Logs events to the Textual devtools console."""
+
+    def __init__(self, frames=False):
+        # Frame events are frequent, so they are only logged when asked for
+        self.frames = frames
+
+    def __call__(self, event: TransitionEvent):
+        if event.name != "frame" or self.frames:
+            log(f"transition {event.name}", transition=event.transition, **event.data)
@@ -0,0 +1,145 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from rich.cells import cell_len, get_character_cell_size
+from rich.segment import Segment
+
+
+def split_cells(segment: Segment, cut: int) -> tuple[Segment, Segment]:
+    """Split a segment at a cell position.
+
+    Like Segment.split_cells, a wide character under the cut is replaced with
+    spaces. Rich's version can overshoot the cut on text that mixes wide and
+    narrow characters, so this walks the text instead.
+    """
+    text, style, control = segment
+    if len(text) == segment.cell_length:
+        return Segment(text[:cut], style, control), Segment(text[cut:], style, control)
+    position = 0
+    for index, character in enumerate(text):
+        if position == cut:
+            return (
+                Segment(text[:index], style, control),
+                Segment(text[index:], style, control),
+            )
+        position += get_character_cell_size(character)
+        if position > cut:
+            return (
+                Segment(text[:index] + " ", style, control),
+                Segment(" " + text[index + 1 :], style, control),
+            )
+    return segment, Segment("", style, control)
+
+
+class CropLine:
+    """A line of segments that can be cropped by cell position.
+
+    The cumulative cell offset of every segment is computed once, so a crop is a
+    bisect for each edge plus at most one segment split per edge.
+    """
+
+    __slots__ = ["segments", "offsets", "cell_length"]
+
+    def __init__(self, segments):
+        self.segments = tuple(
+            segment for segment in segments if segment.text and not segment.control
+        )
+        self.offsets = tuple(
+            accumulate(
+                (segment.cell_length for segment in self.segments),
+                initial=0,
+            )
+        )
+        self.cell_length = self.offsets[-1]
+
+    def crop(self, start: int, end: int) -> list[Segment]:
+        start = max(start, 0)
+        end = min(end, self.cell_length)
+        if start >= end:
+            return []
+        offsets = self.offsets
+        first = bisect_right(offsets, start) - 1
+        last = bisect_right(offsets, end - 1) - 1
+        cropped = list(self.segments[first : last + 1])
+        # Trim the tail first, so the head split is still relative to offsets[first]
+        if offsets[last + 1] > end:
+            cropped[-1] = split_cells(cropped[-1], end - offsets[last])[0]
+        if offsets[first] < start:
+            cropped[0] = split_cells(cropped[0], start - offsets[first])[1]
+        return cropped
+
+
+def align_segments(left, right):
+    """Cut two lines of equal cell length at each other's segment boundaries.
+
+    Returns a list of (left, right) segment pairs with matching cell lengths.
+    """
+    left = [
+        segment
+        for segment in reversed(list(left))
+        if segment.text and not segment.control
+    ]
+    right = [
+        segment
+        for segment in reversed(list(right))
+        if segment.text and not segment.control
+    ]
+    pairs = []
+    while left and right:
+        left_segment = left.pop()
+        right_segment = right.pop()
+        left_length = left_segment.cell_length
+        right_length = right_segment.cell_length
+        if left_length > right_length:
+            left_segment, remainder = split_cells(left_segment, right_length)
+            left.append(remainder)
+        elif right_length > left_length:
+            right_segment, remainder = split_cells(right_segment, left_length)
+            right.append(remainder)
+        pairs.append((left_segment, right_segment))
+    return pairs
+
+
+def pair_styles(line, other):
+    """Cut a line at the style boundaries of another line of equal cell length.
+
+    Returns (segment, other_style) pairs, where `other_style` is the other line's
+    style under the first cell of the segment. A wide character is never cut: a
+    boundary that falls inside one moves to the end of the character, so the
+    piece it starts spans the boundary.
+    """
+    ends = []
+    styles = []
+    position = 0
+    for text, style, control in other:
+        if text and not control:
+            position += cell_len(text)
+            ends.append(position)
+            styles.append(style)
+    pairs = []
+    index = 0
+    position = 0
+    for text, style, control in line:
+        if not text or control:
+            continue
+        single = len(text) == cell_len(text)
+        while text:
+            while index < len(ends) and ends[index] <= position:
+                index += 1
+            if index == len(ends):
+                pairs.append((Segment(text, style), None))
+                break
+            cut = ends[index] - position
+            if single:
+                piece, text = text[:cut], text[cut:]
+                position += len(piece)
+            else:
+                cells = 0
+                length = 0
+                while length < len(text) and cells < cut:
+                    cells += get_character_cell_size(text[length])
+                    length += 1
+                piece, text = text[:length], text[length:]
+                position += cells
+            pairs.append((Segment(piece, style), styles[index]))
+    return pairs
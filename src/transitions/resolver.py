@@ -0,0 +1,62 @@
+from textual.screen import Screen
+
+WILDCARD = "*"
+_MISSING = object()
+
+
+class TransitionResolver:
+    """Looks up the transition for a screen change in a `TRANSITIONS` mapping.
+
+    Keys are `(from, to)` pairs, where each side is a screen id (or installed screen
+    name), a Screen class, which also matches its subclasses, or "*" to match any
+    screen. The most specific rule wins: ids before classes, nearer classes in the
+    MRO before their bases, and the wildcard last. The destination is matched before
+    the source. Results are memoised per (from type, from id, to type, to id), and
+    everything is rebuilt if the mapping changes.
+    """
+
+    def __init__(self, transitions):
+        self.transitions = transitions
+        self.compile()
+
+    def compile(self):
+        self._rules = dict(self.transitions)
+        self._resolved = {}
+
+    @staticmethod
+    def candidates(screen):
+        if isinstance(screen, str):
+            return (screen, WILDCARD)
+        keys = [screen.id] if screen.id else []
+        keys.extend(cls for cls in type(screen).__mro__ if issubclass(cls, Screen))
+        keys.append(WILDCARD)
+        return keys
+
+    def resolve(self, from_screen, to_screen):
+        if self.transitions != self._rules:
+            self.compile()
+        if isinstance(to_screen, str):
+            cache_key = (type(from_screen), from_screen.id, str, to_screen)
+        else:
+            cache_key = (
+                type(from_screen),
+                from_screen.id,
+                type(to_screen),
+                to_screen.id,
+            )
+        transition = self._resolved.get(cache_key, _MISSING)
+        if transition is _MISSING:
+            transition = self._resolved[cache_key] = self._match(from_screen, to_screen)
+        return transition
+
+    def _match(self, from_screen, to_screen):
+        rules = self._rules
+        if not rules:
+            return None
+        from_keys = self.candidates(from_screen)
+        for to_key in self.candidates(to_screen):
+            for from_key in from_keys:
+                transition = rules.get((from_key, to_key))
+                if transition is not None:
+                    return transition
+        return None
@@ -0,0 +1,216 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+
+from textual.app import App
+
+from .snapshot import PendingSnapshot, prepare_transition
+from .timing import TransitionSpec
+from .widgets.screen import ScreenInfo, TransitionScreen
+
+FINISH = "finish"
+RETARGET = "retarget"
+QUEUE = "queue"
+POLICIES = (FINISH, RETARGET, QUEUE)
+
+
+class TransitionScheduler:
+    """Decides what happens to navigation while a transition is animating.
+
+    A single TransitionScreen is installed on first use and reconfigured for every
+    transition after that, so rapid navigation never stacks transition screens. When
+    the app navigates mid-animation, the policy picks what happens:
+
+    - "finish" jumps to the end of the running transition, then navigates.
+    - "retarget" navigates straight away, transitioning from the frame on display.
+    - "queue" holds the navigation until the transition ends. At most `max_queued`
+      navigations are held; the oldest is dropped to make room for a new one.
+
+    Before a transition starts, its snapshots are prepared in a worker thread (see
+    `schedule`). Navigating during preparation drops the transition, and the next
+    one starts from the same snapshot.
+    """
+
+    def __init__(self, app, policy=FINISH, max_queued=2):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES!r}, not {policy!r}")
+        self.app = app
+        self.policy = policy
+        self.queue = deque(maxlen=max(max_queued, 1))
+        self.screen = None
+        self.active = False
+        # The destination screen while its transition is being prepared
+        self.preparing = None
+        self._preparation = None
+        self._from_snapshot = None
+
+    def schedule(self, transition, from_snapshot, to_snapshot, precompute, deadline):
+        """Prepare a transition in a worker thread, then start it.
+
+        Both snapshots must have been captured. The destination screen isn't
+        displayed until the transition starts. If preparing takes longer than
+        `deadline` seconds, the transition is dropped and the destination is
+        displayed as it is.
+        """
+        self.cancel_preparation()
+        screen = self.preparing = self.app.screen
+        self._from_snapshot = from_snapshot
+        self._preparation = asyncio.create_task(
+            self._prepare(
+                screen, transition, from_snapshot, to_snapshot, precompute, deadline
+            )
+        )
+
+    async def _prepare(
+        self, screen, transition, from_snapshot, to_snapshot, precompute, deadline
+    ):
+        spec = TransitionSpec.parse(transition)
+        effect_name = spec.effect
+        start = perf_counter()
+        job = asyncio.get_running_loop().run_in_executor(
+            None,
+            prepare_transition,
+            effect_name,
+            from_snapshot,
+            to_snapshot,
+            spec.diff,
+            precompute,
+        )
+        try:
+            prepared = await asyncio.wait_for(job, deadline)
+        except asyncio.TimeoutError:
+            prepared = None
+        except Exception as error:
+            self.preparing = self._preparation = self._from_snapshot = None
+            self.app._handle_exception(error)
+            return
+        self.preparing = self._preparation = self._from_snapshot = None
+        if prepared is not None:
+            cache = self.app.snapshot_cache
+            cache.store(from_snapshot)
+            cache.store(to_snapshot)
+        instruments = self.app.instruments
+        if instruments is not None:
+            instruments.emit(
+                "snapshot",
+                effect_name,
+                stage="prepare",
+                seconds=perf_counter() - start,
+                timed_out=prepared is None,
+            )
+        if prepared is None or self.app.screen is not screen:
+            screen.refresh()
+            self.drain()
+            return
+        self.start(
+            transition,
+            prepared.from_screen,
+            prepared.to_screen,
+            precompute,
+            effect=prepared.effect,
+            timeline=prepared.timeline,
+        )
+
+    def cancel_preparation(self):
+        """Drop a transition that hasn't started yet, returning its from-snapshot."""
+        if self._preparation is None:
+            return None
+        task = self._preparation
+        screen = self.preparing
+        from_snapshot = self._from_snapshot
+        self.preparing = self._preparation = self._from_snapshot = None
+        task.cancel()
+        screen.refresh()
+        return from_snapshot
+
+    def start(
+        self,
+        transition,
+        from_screen,
+        to_screen,
+        precompute=False,
+        effect=None,
+        timeline=None,
+    ):
+        screen = self.screen
+        if screen is None:
+            screen = self.screen = TransitionScreen(
+                transition,
+                from_screen,
+                to_screen,
+                precompute=precompute,
+                effect=effect,
+                timeline=timeline,
+            )
+            self.app.install_screen(screen, name="_transition")
+        else:
+            screen.prepare(
+                transition,
+                from_screen,
+                to_screen,
+                precompute=precompute,
+                effect=effect,
+                timeline=timeline,
+            )
+        self.app.push_screen(screen)
+        self.active = True
+
+    def intercept(self, navigate, *args) -> bool:
+        """Called before navigating. Returns True if the navigation was deferred."""
+        if self._preparation is not None:
+            # Coalesce: the next transition starts from the screen on display, which
+            # for a pop may be the screen it reveals, and then none plays
+            self.app.pending_snapshot = self.cancel_preparation()
+            if self.queue:
+                # Navigations queued before this one go first
+                self.queue.append((navigate, args))
+                self.drain()
+                return True
+            return False
+        if not self.active:
+            return False
+        if self.policy == QUEUE:
+            self.queue.append((navigate, args))
+            return True
+        if self.policy == RETARGET:
+            container = self.screen.container
+            # Start the next transition from the frame that was on display, taken
+            # before stopping lets go of its floaties
+            strips = container.render_strips()
+            self.interrupt()
+            size = container.from_screen_info.size
+            frame = ScreenInfo.from_strips(size, strips, self.app.screen)
+            self.app.pending_snapshot = PendingSnapshot(
+                self.app.screen, size, screen_info=frame
+            )
+        else:
+            self.interrupt()
+        return False
+
+    def interrupt(self):
+        """Stop the running transition and reveal its destination."""
+        self.screen.container.stop_animation()
+        self.complete(drain=False)
+
+    def complete(self, drain=True):
+        if not self.active:
+            return
+        self.active = False
+        if self.app.screen is self.screen:
+            App.pop_screen(self.app)
+        if drain:
+            self.drain()
+
+    def drain(self):
+        """Run queued navigations, up to the first that starts a transition.
+
+        Called whenever a transition ends or is dropped, so the rest of the queue
+        is never left waiting on a transition that won't play.
+        """
+        # Queued navigations play one transition each; those without a transition
+        # (and so no pending snapshot) don't hold up the rest of the queue
+        while self.queue:
+            navigate, args = self.queue.popleft()
+            navigate(*args)
+            if self.app.pending_snapshot is not None:
+                break
@@ -0,0 +1,66 @@
+from typing import NamedTuple
+
+from .diff import create_effect
+from .effects import Effect
+from .timeline import FrameTimeline
+from .widgets.screen import ScreenInfo
+
+
+class PendingSnapshot:
+    """A deferred capture of the screen a transition starts from.
+
+    Nothing is rendered until the capture is needed: `capture` renders the
+    compositor (required before the screen is detached from the DOM), and
+    `materialise` converts the render to a ScreenInfo once the transition starts.
+    A snapshot that is dropped before then costs nothing more. Strips that were
+    already rendered, or a ready-made `screen_info`, can be given to skip capturing.
+    `generation` is set on snapshots that can be cached (see `SnapshotCache`).
+    """
+
+    __slots__ = ["screen", "size", "generation", "_strips", "_screen_info"]
+
+    def __init__(self, screen, size, screen_info=None, strips=None):
+        self.screen = screen
+        self.size = size
+        self.generation = None
+        self._strips = strips
+        self._screen_info = screen_info
+
+    def capture(self):
+        if self._strips is None and self._screen_info is None:
+            self._strips = self.screen._compositor.render(full=True).strips
+
+    def materialise(self) -> ScreenInfo:
+        if self._screen_info is None:
+            self.capture()
+            self._screen_info = ScreenInfo.from_strips(
+                self.size, self._strips, self.screen
+            )
+            self._strips = None
+        return self._screen_info
+
+
+class PreparedTransition(NamedTuple):
+    from_screen: ScreenInfo
+    to_screen: ScreenInfo
+    effect: Effect
+    timeline: FrameTimeline | None = None
+
+
+def prepare_transition(
+    effect_name, from_snapshot, to_snapshot, diff=False, precompute=False
+) -> PreparedTransition:
+    """Convert captured snapshots and set up the effect, rendering all of its frames
+    if `precompute` is set.
+
+    No widgets are touched, so this can run in a worker thread once both snapshots
+    have been captured.
+    """
+    from_screen = from_snapshot.materialise()
+    to_screen = to_snapshot.materialise()
+    effect = create_effect(effect_name, from_screen, to_screen, diff)
+    timeline = None
+    if precompute:
+        timeline = FrameTimeline(effect)
+        timeline.precompute()
+    return PreparedTransition(from_screen, to_screen, effect, timeline)
@@ -0,0 +1,33 @@
+from threading import Lock
+
+from textual._cache import LRUCache
+
+
+class FrameTimeline:
+    """A bounded cache of an effect's frames, keyed by rounded offset.
+
+    `precompute` renders every distinct frame up front (it is safe to call from a
+    worker thread), after which playback is a cache lookup.
+    """
+
+    def __init__(self, effect, maxsize: int = 1024):
+        self.effect = effect
+        self.maxsize = maxsize
+        self._frames = LRUCache(maxsize)
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def frame(self, offset: int):
+        with self._lock:
+            frame = self._frames.get(offset)
+        if frame is None:
+            frame = tuple(self.effect.frame(offset))
+            with self._lock:
+                self._frames[offset] = frame
+        return frame
+
+    def precompute(self) -> None:
+        for offset in range(min(self.effect.end + 1, self.maxsize)):
+            self.frame(offset)
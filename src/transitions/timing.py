@@ -0,0 +1,83 @@
+from dataclasses import dataclass, replace
+from statistics import median
+
+from .effects import reverse_effect
+
+DEFAULT_FPS = 60
+# Frames measured before the frame rate is adapted
+SAMPLE_FRAMES = 5
+# Spare time left in each frame once the rate has been adapted
+HEADROOM = 1.25
+
+
+@dataclass(frozen=True)
+class TransitionSpec:
+    """A transition in the `TRANSITIONS` mapping.
+
+    Mapping values can be an effect name, a dict of these fields, or a spec. A
+    duration of None uses the effect's own duration. With `diff`, the effect only
+    runs over the region where the two screens differ.
+    """
+
+    effect: str
+    duration: float | None = None
+    fps: float = DEFAULT_FPS
+    diff: bool = False
+
+    @classmethod
+    def parse(cls, transition):
+        if isinstance(transition, cls):
+            return transition
+        if isinstance(transition, str):
+            return cls(transition)
+        if isinstance(transition, dict):
+            return cls(**transition)
+        raise TypeError(f"can't make a transition from {transition!r}")
+
+    def reversed(self) -> "TransitionSpec":
+        return replace(self, effect=reverse_effect(self.effect))
+
+
+class FrameBudget:
+    """Paces the frames of a transition to a target frame rate.
+
+    The cost of the first few frames (rendering them, and writing them to the
+    terminal) is measured. If a frame costs more than the budget for the target
+    rate, the interval between frames is stretched to fit. The duration of the
+    transition doesn't change, so each frame then takes a larger step.
+    """
+
+    __slots__ = ["budget", "interval", "samples", "costs", "frame_cost", "ticks"]
+
+    def __init__(self, fps=DEFAULT_FPS, samples=SAMPLE_FRAMES):
+        self.budget = 1 / fps
+        self.interval = self.budget
+        self.samples = samples
+        self.costs = []
+        self.frame_cost = 0.0
+        self.ticks = 0
+
+    @property
+    def sampling(self) -> bool:
+        return len(self.costs) < self.samples
+
+    @property
+    def fps(self) -> float:
+        return 1 / self.interval
+
+    def add(self, seconds):
+        """Add render or write time to the current frame."""
+        self.frame_cost += seconds
+
+    def dropped(self, seconds) -> int:
+        """The frames short of the target rate, over `seconds` of the transition."""
+        return max(round(seconds / self.budget) + 1 - self.ticks, 0)
+
+    def end_frame(self):
+        self.ticks += 1
+        # Frames that were skipped (and so cost nothing) say nothing about the cost
+        if self.frame_cost and self.sampling:
+            self.costs.append(self.frame_cost)
+            if not self.sampling:
+                self.interval = max(self.budget, median(self.costs) * HEADROOM)
+        self.frame_cost = 0.0
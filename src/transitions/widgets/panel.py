@@ -0,0 +1,145 @@
+import asyncio
+
+from rich.segment import Segment
+from textual.containers import Container
+from textual.geometry import Region
+from textual.screen import Screen
+from textual.strip import Strip
+from textual.widget import Widget
+
+from ..effects import DEFAULT_EFFECT
+from ..lines import CropLine
+from ..snapshot import PendingSnapshot, prepare_transition
+from ..timing import TransitionSpec
+from .screen import TransitionContainer
+
+
+def render_region(screen: Screen, region: Region, exclude=None) -> list[Strip]:
+    """Render the part of a screen within `region`, leaving out `exclude`.
+
+    Only the widgets that overlap the region are rendered, so the cost scales with
+    the region rather than the screen.
+    """
+    x, y, width, height = region
+    lines = [[Segment(" " * width)] for _ in range(height)]
+    widgets = screen._compositor.visible_widgets.items()
+    # Paint from the back, so widgets in front cover those behind them
+    for widget, (widget_region, clip) in reversed(list(widgets)):
+        if widget is exclude or widget.styles.opacity <= 0:
+            continue
+        visible = widget_region.intersection(clip).intersection(region)
+        if not visible:
+            continue
+        strips = widget.render_lines(
+            visible.translate((-widget_region.x, -widget_region.y))
+        )
+        left = visible.x - x
+        right = left + visible.width
+        for line_y, strip in zip(range(visible.y - y, visible.bottom - y), strips):
+            line = CropLine(lines[line_y])
+            lines[line_y] = [*line.crop(0, left), *strip, *line.crop(right, width)]
+    return [Strip(line, width) for line in lines]
+
+
+class TransitionPanel(Container):
+    """Holds a widget, and transitions to another when it's swapped in with `swap`.
+
+    Only the panel's region is snapshotted and animated, by a TransitionContainer
+    laid over the panel while the transition plays. The rest of the screen stays
+    live and interactive throughout.
+    """
+
+    DEFAULT_CSS = """
+    TransitionPanel {
+        layers: default transition;
+        overflow: hidden;
+    }
+    TransitionPanel > TransitionContainer {
+        layer: transition;
+    }
+    """
+
+    def __init__(
+        self,
+        *children: Widget,
+        transition=DEFAULT_EFFECT,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        super().__init__(*children, name=name, id=id, classes=classes)
+        # An effect name, or a dict / TransitionSpec with the effect, duration and fps
+        self.transition = transition
+        self.container = None
+        self._swaps = 0
+
+    async def swap(self, widget: Widget, transition=None) -> None:
+        """Replace the panel's content with `widget`, transitioning to it."""
+        spec = TransitionSpec.parse(transition or self.transition)
+        self._swaps += 1
+        swap = self._swaps
+        region = self.content_region
+        if not region:
+            # Nothing is on display yet, so there is nothing to transition from
+            await self._replace(widget)
+            return
+        # Start from what is on display, which may be a transition part way through
+        from_snapshot = PendingSnapshot(
+            None, region.size, strips=render_region(self.screen, region)
+        )
+        from_screen = from_snapshot.materialise()
+
+        # Hold the current frame over the panel while the new content is laid out.
+        # Diffing a snapshot with itself leaves nothing to animate, and costs little.
+        container = self.container
+        if container is None:
+            container = self.container = TransitionContainer(
+                from_screen, from_screen, spec.effect, diff=True
+            )
+            await self.mount(container)
+        else:
+            container.set_transition(from_screen, from_screen, spec.effect, diff=True)
+            container.display = True
+        await self._replace(widget)
+
+        loop = asyncio.get_running_loop()
+        refreshed = loop.create_future()
+        self.call_after_refresh(refreshed.set_result, None)
+        await refreshed
+        if swap != self._swaps:
+            # Swapped again while this one was being laid out
+            return
+        to_snapshot = PendingSnapshot(
+            None,
+            region.size,
+            strips=render_region(self.screen, region, exclude=container),
+        )
+        prepared = await loop.run_in_executor(
+            None,
+            prepare_transition,
+            spec.effect,
+            from_snapshot,
+            to_snapshot,
+            spec.diff,
+        )
+        if swap != self._swaps:
+            return
+        container.set_transition(
+            prepared.from_screen,
+            prepared.to_screen,
+            spec.effect,
+            effect=prepared.effect,
+        )
+        duration = prepared.effect.duration
+        if duration and spec.duration is not None:
+            duration = spec.duration
+        container.play(duration, spec.fps, on_complete=self._finish)
+
+    async def _replace(self, widget):
+        for child in list(self.children):
+            if child is not self.container:
+                child.remove()
+        await self.mount(widget)
+
+    def _finish(self):
+        self.container.display = False
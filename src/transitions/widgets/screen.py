@@ -1,56 +1,175 @@
-from dataclasses import dataclass
+from array import array
+from itertools import chain
+from time import monotonic, perf_counter
+from weakref import ref
 
-from rich.text import Text
-from textual import log
+from rich.segment import Segment
 from textual.screen import Screen
+from textual.strip import Strip
 from textual.widget import Widget
-from textual.widgets import Label
 from textual.widgets import Static
 from textual.app import ComposeResult
+from textual.geometry import Region, Size
 from textual.reactive import reactive
-from textual import events
+from textual._easing import DEFAULT_EASING, EASING
 
+from ..diff import Crop, create_effect
+from ..lines import CropLine
+from ..timeline import FrameTimeline
+from ..timing import FrameBudget, TransitionSpec
 
-@dataclass
-class ScreenInfo:
-    size: tuple[int, int]
-    content: str
-    screen: Screen
 
+class ScreenInfo:
+    """A compact snapshot of a rendered screen.
 
-class Floaty(Label):
-    CSS = """
-    Floaty {
-        dock: top;
-        margin: 0 0;
-        layer: slider;
-    }
+    Each line is stored as runs of text, with an array of indexes in to a table of
+    the styles used by the snapshot. The screen itself is only weakly referenced,
+    so a snapshot doesn't keep the screen and its widgets alive.
     """
-    offset_x = reactive(0)
-    offset_y = reactive(0)
-
-    def __init__(self, original: Widget, *args, **kwargs):
-        self.original = original
-        super().__init__(*args, **kwargs)
-        self.styles.margin = (original.region.y, 0, 0, original.region.x)
-        self.offset_x = original.region.x
-        self.offset_y = original.region.y
-
-    def watch_offset_x(self, new_value):
-        margin = self.styles.margin
-        self.styles.margin = (margin.top, margin.right, margin.bottom, round(new_value))
-
-    def watch_offset_y(self, new_value):
-        margin = self.styles.margin
-        self.styles.margin = (
-            round(new_value),
-            margin.right,
-            margin.bottom,
-            margin.left,
+
+    __slots__ = ["size", "styles", "runs", "_screen", "_line_hashes"]
+
+    def __init__(self, size, styles, runs, screen=None):
+        self.size = size
+        self.styles = styles
+        self.runs = runs
+        self._screen = None if screen is None else ref(screen)
+        self._line_hashes = None
+
+    @classmethod
+    def from_strips(cls, size, strips, screen=None):
+        style_indexes = {}
+        add_style = style_indexes.setdefault
+        runs = []
+        for strip in strips:
+            segments = [
+                (text, style) for text, style, control in strip if text and not control
+            ]
+            runs.append(
+                (
+                    array(
+                        "I",
+                        [add_style(style, len(style_indexes)) for _, style in segments],
+                    ),
+                    tuple(text for text, _ in segments),
+                )
+            )
+        return cls(size, tuple(style_indexes), tuple(runs), screen)
+
+    @property
+    def screen(self):
+        return None if self._screen is None else self._screen()
+
+    @property
+    def line_hashes(self):
+        """A hash of the text and styles of each line, to find the lines that differ."""
+        if self._line_hashes is None:
+            styles = self.styles
+            self._line_hashes = tuple(
+                hash((texts, tuple(styles[index] for index in indexes)))
+                for indexes, texts in self.runs
+            )
+        return self._line_hashes
+
+    @property
+    def lines(self):
+        """The snapshot as strips (built on each access).
+
+        Strips are built with the known screen width, as the compositor's strips
+        can carry a stale cell length.
+        """
+        styles = self.styles
+        width = self.size[0]
+        return tuple(
+            Strip(
+                [Segment(text, styles[index]) for index, text in zip(indexes, texts)],
+                width,
+            )
+            for indexes, texts in self.runs
         )
 
-    def on_show(self):
-        self.parent.float_this()
+
+class Floaty:
+    """Part of a transition's frames floated from one region to another.
+
+    Floaties aren't mounted: the container composites them in to its frames, so
+    moving one costs a composite rather than a relayout of the screen. Their lines
+    are cropped from the snapshots, so a widget floats with its children, and no
+    widget is rendered again. A floaty shows the `start` region of the from-screen,
+    fitted to its size, until it arrives at the `end` region of the to-screen.
+    """
+
+    __slots__ = ["start", "end", "region", "from_lines", "to_lines", "_fitted"]
+
+    def __init__(self, start: Region, end: Region, from_lines, to_lines):
+        self.start = start
+        self.end = end
+        self.region = start
+        self.from_lines = tuple(CropLine(strip) for strip in from_lines)
+        self.to_lines = tuple(CropLine(strip) for strip in to_lines)
+        self._fitted = {start.size: self.from_lines}
+
+    @classmethod
+    def crop(cls, from_lines, to_lines, start: Region, end: Region) -> "Floaty":
+        """Float the `start` region of one snapshot's lines to the `end` region of
+        another's."""
+        return cls(start, end, Crop(from_lines, start).lines, Crop(to_lines, end).lines)
+
+    def place(self, progress) -> bool:
+        """Move `progress` of the way to the end region. True if it moved."""
+        start, end = self.start, self.end
+        region = Region(
+            round(start.x + (end.x - start.x) * progress),
+            round(start.y + (end.y - start.y) * progress),
+            round(start.width + (end.width - start.width) * progress),
+            round(start.height + (end.height - start.height) * progress),
+        )
+        if region == self.region:
+            return False
+        self.region = region
+        return True
+
+    def render(self) -> tuple[CropLine, ...]:
+        if self.region == self.end:
+            return self.to_lines
+        size = self.region.size
+        lines = self._fitted.get(size)
+        if lines is None:
+            width, height = size
+            strips = [
+                Strip(line.segments, line.cell_length).adjust_cell_length(width)
+                for line in self.from_lines[:height]
+            ]
+            strips.extend([Strip.blank(width, None)] * (height - len(strips)))
+            lines = self._fitted[size] = tuple(CropLine(strip) for strip in strips)
+        return lines
+
+
+def widget_index(screen: Screen) -> dict[str, tuple[Widget, Region]]:
+    """Map the ids of a screen's visible widgets to the widget and the region of it
+    that is visible.
+
+    Built in one pass over the screen's last layout, so it still works for a
+    screen that has been detached.
+    """
+    index = {}
+    for widget, geometry in screen._compositor.map.items():
+        if widget.id is None or widget is screen:
+            continue
+        region = geometry.region.intersection(geometry.clip)
+        if region:
+            index[widget.id] = (widget, region)
+    return index
+
+
+def scrolled_in(region, rows) -> Region:
+    """The rows of `region` exposed by scrolling it up by `rows` (down if negative)."""
+    x, y, width, height = region
+    if abs(rows) >= height:
+        return region
+    if rows > 0:
+        return Region(x, y + height - rows, width, rows)
+    return Region(x, y, width, -rows)
 
 
 class TransitionContainer(Widget):
@@ -58,23 +177,206 @@ class TransitionContainer(Widget):
     Screen TransitionContainer {
         height: 100%;
         width: 100%;
-        layers: normal slider;
         layout: vertical;
         overflow: hidden;
     }
     """
-    transition_offset = reactive(0.0)
+    # Repaints are requested by the watcher, only when the rounded offset changes
+    transition_offset = reactive(0.0, repaint=False)
+    # Floaties with the regions they move between, while morphing
+    floaties = ()
+    frame_budget = None
+    instruments = None
+    # Set while the terminal is scrolled for the effect, rather than repainted
+    hardware_scroll = False
+    _clock = None
+    _frame_timer = None
+
+    def __init__(
+        self,
+        from_screen,
+        to_screen,
+        transition,
+        precompute=False,
+        effect=None,
+        diff=False,
+        timeline=None,
+    ):
+        self._setup(
+            from_screen, to_screen, transition, precompute, effect, diff, timeline
+        )
+        super().__init__()
 
-    def __init__(self, from_screen, to_screen, transition):
+    def _setup(
+        self, from_screen, to_screen, transition, precompute, effect, diff, timeline
+    ):
+        # The effect, and with `precompute` its frames, may have been set up ahead of
+        # time in a worker (see `prepare_transition`). Otherwise frames are kept in the
+        # timeline as they are first rendered.
         self.transition = transition
         self.from_screen_info: ScreenInfo = from_screen
-        self.fade_out = True
         self.to_screen_info: ScreenInfo = to_screen
-        self.from_screen = Text.from_ansi(from_screen.content)
-        self.to_screen = Text.from_ansi(to_screen.content)
+        if effect is None:
+            effect = create_effect(transition, from_screen, to_screen, diff)
+        self.effect = effect
+        if timeline is None and precompute:
+            timeline = FrameTimeline(effect)
+        self.timeline = timeline
+        self.get_frame = effect.frame if timeline is None else timeline.frame
         self.width = self.from_screen_info.size[0]
         self.height = self.from_screen_info.size[1]
-        super().__init__()
+        self.rendered_offset = 0
+        self._frame = ()
+        self._frame_key = None
+        self.pending_scroll = 0
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+    def set_transition(
+        self,
+        from_screen,
+        to_screen,
+        transition,
+        precompute=False,
+        effect=None,
+        diff=False,
+        timeline=None,
+    ):
+        """Reuse this container for another transition."""
+        self.stop_animation()
+        self._setup(
+            from_screen, to_screen, transition, precompute, effect, diff, timeline
+        )
+        self.transition_offset = 0.0
+        self.frames_skipped = 0
+        self.refresh(layout=True)
+
+    def play(self, duration, fps, on_complete, floaties=()):
+        """Play the transition to its end over `duration` seconds, paced to `fps`,
+        compositing `floaties` in to its frames."""
+        self._stop_clock()
+        self.floaties = floaties
+        self._frame_key = None
+        self.frame_budget = FrameBudget(fps)
+        self._clock = (monotonic(), duration, on_complete)
+        self.instruments = getattr(self.app, "instruments", None)
+        can_scroll = getattr(self.app, "can_scroll_terminal", None)
+        # Only a transition screen's frames are scrolled by the app
+        self.hardware_scroll = bool(
+            self.effect.scroll
+            and isinstance(self.screen, TransitionScreen)
+            and can_scroll is not None
+            and can_scroll()
+        )
+        if self.instruments is not None:
+            self.instruments.emit(
+                "start",
+                self.transition,
+                duration=duration,
+                fps=fps,
+                size=self.from_screen_info.size,
+            )
+        self._next_frame()
+
+    def _next_frame(self):
+        if self._clock is None:
+            # A tick from a timer that was stopped while it was due
+            return
+        start, duration, on_complete = self._clock
+        budget = self.frame_budget
+        interval = budget.interval
+        budget.end_frame()
+        progress = min((monotonic() - start) / duration, 1.0) if duration else 1.0
+        self.transition_offset = self.effect.end * EASING[DEFAULT_EASING](progress)
+        if progress >= 1.0:
+            if self.instruments is not None:
+                self._emit_end(interrupted=False)
+            self._clock = None
+            self.stop_animation()
+            on_complete()
+        elif self._frame_timer is None or budget.interval != interval:
+            # Frames cost more than the budget, so fewer (and bigger) steps are taken
+            if self._frame_timer is not None:
+                self._frame_timer.stop_no_wait()
+            self._frame_timer = self.set_interval(budget.interval, self._next_frame)
+
+    def stop_animation(self):
+        """Stop the transition where it is, without calling its completion callback.
+
+        The floaties and any precomputed frames are let go, as a reused container
+        would otherwise hold them until its next transition.
+        """
+        self._stop_clock()
+        if self.floaties:
+            self.floaties = ()
+            self._frame_key = None
+        if self.timeline is not None:
+            self.timeline = None
+            self.get_frame = self.effect.frame
+
+    def _stop_clock(self):
+        if self._frame_timer is not None:
+            self._frame_timer.stop_no_wait()
+            self._frame_timer = None
+        if self._clock is not None and self.instruments is not None:
+            self._emit_end(interrupted=True)
+        self._clock = None
+        self.hardware_scroll = False
+        self.pending_scroll = 0
+
+    def _emit_end(self, interrupted):
+        seconds = monotonic() - self._clock[0]
+        self.instruments.emit(
+            "end",
+            self.transition,
+            frames_rendered=self.frames_rendered,
+            frames_skipped=self.frames_skipped,
+            frames_dropped=self.frame_budget.dropped(seconds),
+            seconds=seconds,
+            fps=self.frame_budget.fps,
+            interrupted=interrupted,
+        )
+
+    def watch_transition_offset(self, transition_offset):
+        moved = None
+        if self.floaties:
+            moved = self.move_floaties(transition_offset / self.effect.end)
+        offset = round(transition_offset)
+        if offset == self.rendered_offset:
+            if moved is None:
+                self.frames_skipped += 1
+                return
+            damage = moved
+        elif self.hardware_scroll:
+            # The terminal moves the rows already on screen, so only the rows that
+            # have scrolled in since the last update are written
+            self.pending_scroll += (offset - self.rendered_offset) * self.effect.scroll
+            damage = scrolled_in(self.effect.scroll_region, self.pending_scroll)
+        else:
+            damage = self.effect.damage(self.rendered_offset, offset)
+            if damage is not None and moved is not None:
+                damage = damage.union(moved)
+        if moved is not None:
+            # Composite the floaties again, in their new places
+            self._frame_key = None
+        self.rendered_offset = offset
+        self.frames_rendered += 1
+        if damage is None:
+            self.refresh()
+        else:
+            self.refresh(damage)
+
+    def take_scroll(self):
+        """The region of the screen to scroll, and by how many rows, before the next
+        update is written. None if there is nothing to scroll."""
+        rows, self.pending_scroll = self.pending_scroll, 0
+        if not rows:
+            return None
+        region = self.effect.scroll_region.translate(self.region.offset)
+        if abs(rows) >= region.height:
+            # Every row is written anyway
+            return None
+        return region, rows
 
     def get_content_height(self, container, viewport, width: int) -> int:
         return self.from_screen_info.size[1]
@@ -82,180 +384,111 @@ class TransitionContainer(Widget):
     def get_content_width(self, container, viewport) -> int:
         return self.from_screen_info.size[0]
 
-    def __rich_console__(self, console, options):
-        match self.transition:
-            case "slideover_up":
-                lines = self.from_screen.split()[
-                    0 : self.height - round(self.transition_offset)
-                ]
-                lines.extend(self.to_screen.split()[0 : round(self.transition_offset)])
-
-                yield from lines
-            case "wipe_up":
-                lines = self.from_screen.split()[
-                    0 : self.height - round(self.transition_offset)
-                ]
-                lines.extend(
-                    self.to_screen.split()[
-                        self.height - round(self.transition_offset) : self.height
-                    ]
-                )
-                yield from lines
-            case "slide_up":
-                lines = self.from_screen.split()
-                lines.extend(self.to_screen.split())
-
-                yield from lines[
-                    round(self.transition_offset) : round(self.transition_offset)
-                    + self.height
-                ]
-            case "slideover_down":
-                lines = self.to_screen.split()[
-                    self.height - round(self.transition_offset) : self.height
-                ]
-
-                lines.extend(
-                    self.from_screen.split()[
-                        round(self.transition_offset) : self.height
-                    ]
-                )
-
-                yield from lines
-            case "slide_down":
-                lines = self.to_screen.split()
-                lines.extend(self.from_screen.split())
-
-                offset = (-1 * round(self.transition_offset)) + self.height
-
-                yield from lines[offset : offset + self.height]
-            case "wipe_down":
-                lines = self.to_screen.split()[0 : round(self.transition_offset)]
-                lines.extend(
-                    self.from_screen.split()[
-                        round(self.transition_offset) : self.height
-                    ]
-                )
-
-                yield from lines
-            case "slide_left":
-                from_columns = [
-                    x[round(self.transition_offset) : self.width]
-                    for x in self.from_screen.split()
-                ]
-                to_columns = [
-                    x[0 : round(self.transition_offset)] for x in self.to_screen.split()
-                ]
-
-                for (from_line, to_line) in zip(from_columns, to_columns):
-                    yield Text("").join([from_line, to_line])
-            case "slideover_left":
-                from_columns = [
-                    x[0 : self.width - round(self.transition_offset)]
-                    for x in self.from_screen.split()
+    def render_line(self, y: int) -> Strip:
+        # Textual asks for each row it needs to repaint, so the frame for the current
+        # offset is built once and its rows are handed out as they are. Rows that come
+        # from a snapshot are the snapshot's own strips, and need no more work.
+        # If the container has been resized away from the snapshots' size, the rows are
+        # padded or cropped to fit until the transition ends.
+        width = self.size.width
+        key = (self.rendered_offset, width)
+        if key != self._frame_key:
+            frame = self.render_strips()
+            if frame and frame[0].cell_length != width:
+                frame = [
+                    strip.adjust_cell_length(width, self.rich_style) for strip in frame
                 ]
-                to_columns = [
-                    x[0 : round(self.transition_offset)] for x in self.to_screen.split()
-                ]
-
-                for (from_line, to_line) in zip(from_columns, to_columns):
-                    yield Text("").join([from_line, to_line])
-            case "wipe_left":
-                from_columns = [
-                    x[0 : self.width - round(self.transition_offset)]
-                    for x in self.from_screen.split()
-                ]
-                to_columns = [
-                    x[self.width - round(self.transition_offset) : self.width - 1]
-                    for x in self.to_screen.split()
-                ]
-
-                for (from_line, to_line) in zip(from_columns, to_columns):
-                    yield Text("").join([from_line, to_line])
-            case "slide_right":
-                from_offset = max(0, self.width - round(self.transition_offset) - 1)
-
-                from_columns = [x[0:from_offset] for x in self.from_screen.split()]
-                to_columns = [
-                    x[from_offset : self.width] for x in self.to_screen.split()
-                ]
-
-                for lines in zip(to_columns, from_columns):
-                    yield Text("").join(lines)
-            case "slideover_right":
-                from_offset = max(0, self.width - round(self.transition_offset) - 1)
-
-                from_columns = [
-                    x[round(self.transition_offset) : self.width - 1]
-                    for x in self.from_screen.split()
-                ]
-                to_columns = [
-                    x[from_offset : self.width] for x in self.to_screen.split()
-                ]
-
-                for lines in zip(to_columns, from_columns):
-                    yield Text("").join(lines)
-            case "wipe_right":
-                from_offset = max(0, self.width - round(self.transition_offset) - 1)
-
-                from_columns = [
-                    x[round(self.transition_offset) : self.width - 1]
-                    for x in self.from_screen.split()
-                ]
-                to_columns = [
-                    x[0 : round(self.transition_offset)] for x in self.to_screen.split()
-                ]
-
-                for lines in zip(to_columns, from_columns):
-                    yield Text("").join(lines)
-            case "fade_up" | "fade_down" | "fade_left" | "fade_right" | "morph":
-                log(self.transition_offset, self.fade_out)
-                if self.fade_out:
-                    self.styles.opacity = f"{round(105-self.transition_offset*2)+1}%"
-                    if self.transition_offset >= 50:
-                        self.fade_out = False
-                        log(self.transition_offset, self.fade_out)
-                    yield self.from_screen
-                else:
-                    self.styles.opacity = f"{round(self.transition_offset*2-100)}%"
-                    # self.styles.opacity = "25%"
-                    yield self.to_screen
-
-    def morph(self):
-        from_ids = set(
-            x.id for x in self.from_screen_info.screen.walk_children() if x.id
-        )
-        to_ids = set(x.id for x in self.to_screen_info.screen.walk_children() if x.id)
-        morph_id = from_ids.intersection(to_ids)
-        if len(morph_id) > 1 or not morph_id:
-            raise Exception()
-        morph_id = morph_id.pop()
-
-        self.from_widget = self.from_screen_info.screen.query_one(f"#{morph_id}")
-        self.to_widget = self.to_screen_info.screen.query_one(f"#{morph_id}")
-        self.floaty = Floaty(self.from_widget, self.from_widget.renderable)
-        self.floaty.styles.layer = "slider"
-        self.floaty.styles.border = self.from_widget.styles.border
-        self.floaty.styles.width = self.from_widget.region.width
-        self.screen.mount(self.floaty)
-
-    def float_this(self):
-        duration = 0.75
-        self.animate(
-            "transition_offset",
-            100,
-            duration=1.5,
-            on_complete=self.screen.app.pop_screen,
-        )
-        self.floaty.animate("offset_x", self.to_widget.region.x, duration=duration)
-        self.floaty.animate("offset_y", self.to_widget.region.y, duration=duration)
-        self.floaty.styles.animate(
-            "width",
-            self.to_widget.region.width,
-            duration=duration,
+            self._frame = frame
+            self._frame_key = key
+        frame = self._frame
+        if y < len(frame):
+            return frame[y]
+        return Strip.blank(width, self.rich_style)
+
+    def render_strips(self):
+        budget = self.frame_budget
+        instruments = self.instruments
+        if instruments is None and (budget is None or not budget.sampling):
+            return self._render_frame()
+        start = perf_counter()
+        frame = self._render_frame()
+        seconds = perf_counter() - start
+        if budget is not None and budget.sampling:
+            budget.add(seconds)
+        if instruments is not None:
+            instruments.emit(
+                "frame", self.transition, offset=self.rendered_offset, seconds=seconds
+            )
+        return frame
+
+    def _render_frame(self):
+        frame = self.get_frame(self.rendered_offset)
+        if not self.floaties:
+            return frame
+        frame = list(frame)
+        width = self.width
+        for floaty in self.floaties:
+            x, y, floaty_width, height = floaty.region
+            # Floaties are clipped to the frame
+            left = max(-x, 0)
+            right = min(floaty_width, width - x)
+            for row, floaty_line in enumerate(floaty.render()):
+                line_y = y + row
+                if 0 <= line_y < len(frame) and left < right:
+                    line = CropLine(frame[line_y])
+                    frame[line_y] = Strip(
+                        [
+                            *line.crop(0, x),
+                            *floaty_line.crop(left, right),
+                            *line.crop(x + floaty_width, width),
+                        ],
+                        width,
+                    )
+        return frame
+
+    def morph(self, duration, fps):
+        """Float every widget the two screens share an id with to its new place.
+
+        The rest of the screen cross-fades underneath, and the floating widgets are
+        moved by the same clock.
+        """
+        from_screen = self.from_screen_info.screen
+        to_screen = self.to_screen_info.screen
+        floaties = []
+        # If a screen has already been released, there are no widgets to float
+        if from_screen is not None and to_screen is not None:
+            from_widgets = widget_index(from_screen)
+            to_widgets = widget_index(to_screen)
+            shared = from_widgets.keys() & to_widgets.keys()
+            from_lines = self.from_screen_info.lines
+            to_lines = self.to_screen_info.lines
+            for widget_id, (widget, start) in from_widgets.items():
+                if widget_id not in shared:
+                    continue
+                to_widget, end = to_widgets[widget_id]
+                ancestors = chain(widget.ancestors, to_widget.ancestors)
+                if any(ancestor.id in shared for ancestor in ancestors):
+                    # It's in the crop of an ancestor, so floats along with that
+                    continue
+                floaties.append(Floaty.crop(from_lines, to_lines, start, end))
+        self.play(
+            duration,
+            fps,
+            on_complete=self.screen.finish_transition,
+            floaties=tuple(floaties),
         )
 
-    def render(self):
-        return self
+    def move_floaties(self, progress) -> Region | None:
+        """Move the floaties along, returning the region they moved over, if any."""
+        # The widgets arrive halfway through the transition
+        progress = min(progress * 2, 1.0)
+        damage = None
+        for floaty in self.floaties:
+            region = floaty.region
+            if floaty.place(progress):
+                region = region.union(floaty.region)
+                damage = region if damage is None else damage.union(region)
+        return damage
 
 
 class TransitionScreen(Screen):
@@ -263,7 +496,6 @@ class TransitionScreen(Screen):
     CSS = """
     TransitionScreen {
         layout: vertical;
-        layers: normal slider;
         padding: 0;
         margin: 0;
     }
@@ -273,58 +505,89 @@ class TransitionScreen(Screen):
     }
     """
 
-    def __init__(self, transition, from_screen, to_screen):
+    def __init__(
+        self,
+        transition,
+        from_screen,
+        to_screen,
+        precompute=False,
+        duration=None,
+        fps=None,
+        effect=None,
+        timeline=None,
+    ):
+        self._configure(transition, from_screen, to_screen, precompute, duration, fps)
+        self.effect = effect
+        self.timeline = timeline
+        super().__init__()
+
+    def _configure(self, transition, from_screen, to_screen, precompute, duration, fps):
+        # `transition` can be an effect name or anything TransitionSpec can parse;
+        # an explicit duration or fps overrides the spec's
+        spec = TransitionSpec.parse(transition)
         self.from_screen = from_screen
         self.to_screen = to_screen
-        self.transition = transition
-        super().__init__()
+        self.transition = spec.effect
+        self.precompute = precompute
+        self.duration = spec.duration if duration is None else duration
+        self.fps = spec.fps if fps is None else fps
+        self.diff = spec.diff
 
     def compose(self) -> ComposeResult:
         self.container = TransitionContainer(
-            self.from_screen, self.to_screen, transition=self.transition
+            self.from_screen,
+            self.to_screen,
+            transition=self.transition,
+            precompute=self.precompute,
+            effect=self.effect,
+            diff=self.diff,
+            timeline=self.timeline,
         )
+        # The container has them now, and lets them go once the transition ends
+        self.effect = self.timeline = None
         yield self.container
 
-    def float_this(self):
-        self.container.float_this()
+    def prepare(
+        self,
+        transition,
+        from_screen,
+        to_screen,
+        precompute=False,
+        duration=None,
+        fps=None,
+        effect=None,
+        timeline=None,
+    ):
+        """Set up this screen for another transition, before it is pushed again."""
+        self._configure(transition, from_screen, to_screen, precompute, duration, fps)
+        self.container.set_transition(
+            from_screen,
+            to_screen,
+            self.transition,
+            precompute=precompute,
+            effect=effect,
+            diff=self.diff,
+            timeline=timeline,
+        )
 
     def finish_transition(self):
-        self.app.pop_screen()
-
-    def on_show(self, event) -> None:
-        delay = 2
-        self.app.log(self.transition)
-        match self.transition:
-            case "slide_up" | "slide_down" | "slideover_up" | "slideover_down" | "wipe_up" | "wipe_down":
-                self.container.animate(
-                    "transition_offset",
-                    self.from_screen.size[1],
-                    duration=delay,
-                    on_complete=self.finish_transition,
-                )
-            case "slide_left" | "slide_right" | "slideover_left" | "slideover_right" | "wipe_left" | "wipe_right":
-                self.container.animate(
-                    "transition_offset",
-                    self.from_screen.size[0],
-                    duration=delay,
-                    on_complete=self.finish_transition,
-                )
-            case "fade_up" | "fade_down" | "fade_left" | "fade_right":
-                self.container.animate(
-                    "transition_offset",
-                    100,
-                    duration=delay,
-                    on_complete=self.finish_transition,
-                )
-            case "morph":
-                self.container.morph()
-            case _:
-                self.container.animate(
-                    "transition_offset",
-                    self.from_screen.size[1],
-                    duration=delay,
-                    on_complete=self.finish_transition,
-                )
+        scheduler = getattr(self.app, "transition_scheduler", None)
+        if scheduler is not None:
+            scheduler.complete()
+        elif self.app.screen is self:
+            self.app.pop_screen()
+
+    def on_screen_resume(self) -> None:
+        # Started on resume rather than on show, as a reused screen isn't shown again
+        effect = self.container.effect
+        # An effect without a duration has nothing to animate, so it ends at once
+        duration = effect.duration
+        if duration and self.duration is not None:
+            duration = self.duration
+        if effect.morph:
+            self.container.morph(duration, self.fps)
+        else:
+            self.container.play(duration, self.fps, on_complete=self.finish_transition)
 
 
 class MessageScreen(Screen):
@@ -335,57 +598,8 @@ class MessageScreen(Screen):
 
 
 class LiquidScreen(Screen):
-    def on_screen_resume(self):
-        self.need_transition = True
-
-    def on_show(self, event):
-        self.app.screen_showed()
-        self.need_transition = False
+    """A screen to transition to.
 
-    def _refresh_layout(self, size=None, full: bool = False) -> None:
-        """Refresh the layout (can change size and positions of widgets)."""
-        size = self.outer_size if size is None else size
-        if not size:
-            return
-
-        self._compositor.update_widgets(self._dirty_widgets)
-        self.update_timer.pause()
-        try:
-            hidden, shown, resized = self._compositor.reflow(self, size)
-            Hide = events.Hide
-            Show = events.Show
-
-            for widget in hidden:
-                widget.post_message_no_wait(Hide(self))
-
-            # We want to send a resize event to widgets that were just added or change since last layout
-            send_resize = shown | resized
-            ResizeEvent = events.Resize
-
-            layers = self._compositor.layers
-            for widget, (
-                region,
-                _order,
-                _clip,
-                virtual_size,
-                container_size,
-                _,
-            ) in layers:
-                widget._size_updated(region.size, virtual_size, container_size)
-                if widget in send_resize:
-                    widget.post_message_no_wait(
-                        ResizeEvent(self, region.size, virtual_size, container_size)
-                    )
-
-            for widget in shown:
-                widget.post_message_no_wait(Show(self))
-
-        except Exception as error:
-            self.app._handle_exception(error)
-            return
-        display_update = self._compositor.render(full=True)
-        if not self.need_transition:
-            self.app._display(self, display_update)
-        if not self.app._dom_ready:
-            self.app.post_message_no_wait(events.Ready(self))
-            self.app._dom_ready = True
+    Any screen can be the destination of a transition; TransitionsApp holds back
+    its first render and uses it as the snapshot to transition to.
+    """